@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Shared API client against the local fake OpenAI endpoint
+Measures the latency of the productivity analysis with a new OpenAI
+client per call (as before) and with the shared, pooled ApiClient, then
+runs several stations in parallel against an endpoint that rejects
+requests above a rate limit, with and without the token bucket, and
+sends screenshots one by one and in batches.
+
+Usage:
+    python benchmarks/api_client.py [--requests N] [--stations N] [--rate-limit R] [--output FILE]
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from focuson.api_client import ApiClient
+from focuson.fake_api import FakeOpenAIServer
+from focuson.productivity import PROMPT, analyze_productivity_with_chatgpt, analyze_screenshots
+
+
+def screenshot_base64():
+    """Returns a small JPEG screenshot, base64 encoded"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (320, 180), (240, 240, 240)).save(buffer, format="JPEG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def per_call_client(server, image, requests):
+    """Times the analysis with a new OpenAI client, and connection, per call"""
+    from openai import OpenAI
+
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client = OpenAI(api_key="fake", base_url=server.base_url, max_retries=0)
+        client.chat.completions.create(
+            model="gpt-4.1-mini",
+            messages=[{"role": "user", "content": [
+                {"type": "text", "text": PROMPT},
+                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image}"}},
+            ]}],
+            max_tokens=50,
+        )
+        client.close()
+        samples.append(time.perf_counter() - start)
+    return np.asarray(samples) * 1000
+
+
+def shared_client(server, image, requests):
+    """Times the analysis with the shared ApiClient"""
+    client = ApiClient(api_key="fake", base_url=server.base_url, rate=None)
+    analyze_productivity_with_chatgpt(image, 10, client)  # The first call creates the client
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        analyze_productivity_with_chatgpt(image, 10, client)
+        samples.append(time.perf_counter() - start)
+    client.close()
+    return np.asarray(samples) * 1000
+
+
+def stations(server, image, count, requests, rate):
+    """Runs stations in parallel, each sending requests as fast as allowed,
+    and returns the number of errors, rejections and retries and the duration
+    """
+    clients = [ApiClient(api_key="fake", base_url=server.base_url, rate=rate, burst=1, backoff_base=0.2)
+               for _ in range(count)]
+    results = []
+
+    def station(client):
+        for _ in range(requests):
+            results.append(analyze_productivity_with_chatgpt(image, 30, client))
+
+    server.rejected = 0
+    start = time.perf_counter()
+    threads = [threading.Thread(target=station, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        "rate_per_station": rate,
+        "errors": sum(result.startswith("Error") for result in results),
+        "rejected": server.rejected,
+        "retries": sum(client.retries for client in clients),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def batches(server, image, requests, batch_size):
+    """Times the analysis of screenshots sent batch_size at a time"""
+    client = ApiClient(api_key="fake", base_url=server.base_url, rate=None)
+    analyze_screenshots([image], 10, client)
+    sent = len(server.requests)
+    start = time.perf_counter()
+    for _ in range(requests // batch_size):
+        analyze_screenshots([image] * batch_size, 10, client)
+    client.close()
+    return {"batch_size": batch_size, "requests": len(server.requests) - sent, "seconds": time.perf_counter() - start}
+
+
+def summary(samples):
+    return {"p50_ms": float(np.percentile(samples, 50)), "p95_ms": float(np.percentile(samples, 95)),
+            "mean_ms": float(np.mean(samples))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--delay", type=float, default=0.0, help="Response time of the fake endpoint, in seconds")
+    parser.add_argument("--stations", type=int, default=4)
+    parser.add_argument("--rate-limit", type=float, default=8.0, help="Requests per second allowed by the fake endpoint")
+    parser.add_argument("--output", default="bench_api_client.json")
+    args = parser.parse_args()
+
+    image = screenshot_base64()
+    server = FakeOpenAIServer(delay=args.delay).start()
+    results = {}
+    try:
+        connections = server.connections
+        results["per_call_client"] = summary(per_call_client(server, image, args.requests))
+        results["per_call_client"]["connections"] = server.connections - connections
+        connections = server.connections
+        results["shared_client"] = summary(shared_client(server, image, args.requests))
+        results["shared_client"]["connections"] = server.connections - connections
+
+        server.rate_limit = args.rate_limit
+        share = args.rate_limit / args.stations
+        results["stations"] = [stations(server, image, args.stations, 10, rate) for rate in (None, share)]
+        server.rate_limit = None
+
+        results["batches"] = [batches(server, image, 16, size) for size in (1, 4)]
+    finally:
+        server.stop()
+
+    print(f"{args.requests} analyses against the fake endpoint")
+    print(f"{'client':<18}{'p50 (ms)':>10}{'p95 (ms)':>10}{'connections':>13}")
+    for name in ("per_call_client", "shared_client"):
+        stats = results[name]
+        print(f"{name:<18}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['connections']:>13}")
+
+    print(f"\n{args.stations} stations, 10 analyses each, endpoint limited to {args.rate_limit:g} requests per second")
+    print(f"{'rate per station':<18}{'errors':>8}{'rejected':>10}{'retries':>9}{'seconds':>9}")
+    for stats in results["stations"]:
+        rate = "unlimited" if stats["rate_per_station"] is None else f"{stats['rate_per_station']:g}/s"
+        print(f"{rate:<18}{stats['errors']:>8}{stats['rejected']:>10}{stats['retries']:>9}{stats['seconds']:>9.2f}")
+
+    print("\n16 screenshots")
+    for stats in results["batches"]:
+        print(f"batches of {stats['batch_size']}: {stats['requests']} requests in {stats['seconds'] * 1000:.1f} ms")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
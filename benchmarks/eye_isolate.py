@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of Eye._isolate
+Compares the per-eye time of the previous full-frame masking with
+the current masking done on the eye bounding box only, at 720p and 1080p.
+
+Usage:
+    python benchmarks/eye_isolate.py [--iterations N]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from gaze_tracking.eye import Eye, EyeLandmarks
+
+Point = namedtuple("Point", ["x", "y"])
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+}
+
+# Left eye contour (landmarks 36 to 41) of a face in the middle of a 720p frame
+LEFT_EYE_720P = [(560, 300), (575, 290), (595, 290), (610, 300), (595, 308), (575, 308)]
+
+
+class FakeLandmarks(object):
+    """Stands for dlib.full_object_detection, with the left eye points set and
+    the right eye points shifted 100 pixels to the right"""
+
+    def __init__(self, points):
+        self._points = {36 + i: Point(x, y) for i, (x, y) in enumerate(points)}
+        self._points.update({42 + i: Point(x + 100, y) for i, (x, y) in enumerate(points)})
+
+    def part(self, index):
+        return self._points[index]
+
+
+def full_frame_isolate(frame, landmarks, points):
+    """Previous implementation of Eye._isolate, masking the whole frame"""
+    region = np.array([(landmarks.part(point).x, landmarks.part(point).y) for point in points])
+    region = region.astype(np.int32)
+
+    height, width = frame.shape[:2]
+    black_frame = np.zeros((height, width), np.uint8)
+    mask = np.full((height, width), 255, np.uint8)
+    cv2.fillPoly(mask, [region], (0, 0, 0))
+    eye = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
+
+    margin = 5
+    min_x = np.min(region[:, 0]) - margin
+    max_x = np.max(region[:, 0]) + margin
+    min_y = np.min(region[:, 1]) - margin
+    max_y = np.max(region[:, 1]) + margin
+    return eye[min_y:max_y, min_x:max_x]
+
+
+def roi_isolate(frame, landmarks, points):
+    """Current implementation of Eye._isolate, including the conversion of the landmarks"""
+    eye_landmarks = EyeLandmarks(landmarks)
+    eye = Eye.__new__(Eye)
+    eye._isolate(frame, eye_landmarks.points[0], eye_landmarks.boxes[0])
+    return eye.frame
+
+
+def time_per_call(function, iterations, *args):
+    """Returns the average duration of a call, in microseconds"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(*args)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    points = Eye.LEFT_EYE_POINTS
+
+    print(f"{'resolution':<12}{'full frame (us)':>18}{'eye box (us)':>16}{'speedup':>10}")
+    for name, (width, height) in RESOLUTIONS.items():
+        scale = width / 1280
+        frame = rng.integers(0, 256, (height, width), dtype=np.uint8)
+        landmarks = FakeLandmarks([(int(x * scale), int(y * scale)) for x, y in LEFT_EYE_720P])
+
+        if not np.array_equal(full_frame_isolate(frame, landmarks, points), roi_isolate(frame, landmarks, points)):
+            raise SystemExit(f"Eye frames differ at {name}")
+
+        before = time_per_call(full_frame_isolate, args.iterations, frame, landmarks, points)
+        after = time_per_call(roi_isolate, args.iterations, frame, landmarks, points)
+        print(f"{name:<12}{before:>18.1f}{after:>16.1f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Per-stage benchmark of the gaze_tracking hot path
+Times each stage of GazeTracking.refresh separately on fixed frames, at
+several resolutions, and writes p50/p95/p99 latencies and frames per
+second to a JSON file, to compare releases.
+
+Stages: grayscale conversion, face detection, shape_predictor,
+EyeLandmarks (landmarks array, blinking ratios and boxes), Eye._isolate, Pupil (image_processing and detect_iris),
+Calibration.evaluate, GazeTracking.annotated_frame and the full refresh,
+with the detection, landmarks and pupils stages it reports to its metrics.
+
+Usage:
+    python benchmarks/gaze_tracking_stages.py [--fixtures DIR] [--iterations N] [--output FILE]
+
+Fixtures are images of a face, resized to each resolution, the frames
+of benchmarks/fixtures/faces by default. The benchmark stops if the
+face of a fixture is not detected, or if its pupils are not located,
+so that every stage runs on the real pipeline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import cv2
+import dlib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from gaze_tracking import GazeTracking
+from gaze_tracking.calibration import Calibration
+from gaze_tracking.eye import Eye, EyeLandmarks
+from gaze_tracking.pupil import Pupil
+
+RESOLUTIONS = {
+    "480p": (640, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+}
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "faces")
+
+
+def load_fixtures(directory):
+    """Returns the names and frames of the fixture images of a directory"""
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS))
+    fixtures = [(name, cv2.imread(os.path.join(directory, name))) for name in names]
+    return [(name, frame) for name, frame in fixtures if frame is not None]
+
+
+def percentiles(samples):
+    """Returns the latency percentiles, in milliseconds, and the frames per second"""
+    samples = np.asarray(samples) * 1000
+    mean = float(np.mean(samples))
+    return {
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "mean_ms": mean,
+        "fps": 1000 / mean if mean > 0 else None,
+    }
+
+
+class StageSamples(object):
+    """Keeps every latency that GazeTracking reports through its metrics, per stage"""
+
+    def __init__(self):
+        self.samples = {}
+
+    def observe(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+
+def measure(function, frames, iterations):
+    """Calls the function on each frame in turn and returns the duration of every call"""
+    samples = []
+    for i in range(iterations):
+        argument = frames[i % len(frames)]
+        start = time.perf_counter()
+        function(argument)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def benchmark_resolution(gaze, stage_samples, names, frames, iterations):
+    """Times every stage on frames of one resolution"""
+    grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+    height, width = grays[0].shape[:2]
+
+    faces = []
+    for name, gray, frame in zip(names, grays, frames):
+        detected = gaze.detect_faces(gray, scale=1.0)
+        if len(detected) == 0:
+            raise SystemExit(f"No face detected in {name} at {width}x{height}")
+        if not gaze.refresh(frame).pupils_located:
+            raise SystemExit(f"Pupils not located in {name} at {width}x{height}")
+        faces.append(detected[0])
+
+    landmarks = [gaze.predict_landmarks(gray, face) for gray, face in zip(grays, faces)]
+    cases = list(zip(grays, [EyeLandmarks(points) for points in landmarks]))
+
+    def isolate(case):
+        gray, eye_landmarks = case
+        for side in (0, 1):
+            eye = Eye.__new__(Eye)
+            eye._isolate(gray, eye_landmarks.points[side], eye_landmarks.boxes[side])
+
+    eye_frames = []
+    for gray, eye_landmarks in cases:
+        eye = Eye.__new__(Eye)
+        eye._isolate(gray, eye_landmarks.points[0], eye_landmarks.boxes[0])
+        eye_frames.append(eye.frame)
+
+    stages = {
+        "grayscale": measure(lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), frames, iterations),
+        "face_detection": measure(lambda gray: gaze.detect_faces(gray, scale=1.0), grays, iterations),
+        "face_detection_scaled": measure(gaze.detect_faces, grays, iterations),
+        "shape_predictor": measure(lambda i: gaze.predict_landmarks(grays[i], faces[i]), list(range(len(grays))),
+                                   iterations),
+        "eye_landmarks": measure(EyeLandmarks, landmarks, iterations),
+        "eye_isolate": measure(isolate, cases, iterations),
+        "pupil": measure(lambda eye_frame: Pupil(eye_frame, 50), eye_frames, iterations),
+        "calibration_evaluate": measure(lambda eye_frame: Calibration().evaluate(eye_frame, 0), eye_frames, iterations),
+        "annotated_frame": measure(lambda frame: gaze.annotated_frame(), frames, iterations),
+    }
+    # The stages of refresh as it reports them, the landmarks and pupils only on frames with a face
+    stage_samples.samples.clear()
+    stages["refresh"] = measure(gaze.refresh, frames, iterations)
+    for stage, samples in stage_samples.samples.items():
+        stages[f"refresh_{stage}"] = samples
+    return {name: percentiles(samples) for name, samples in stages.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES, help="Folder of face images")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--resolution", action="append", choices=sorted(RESOLUTIONS),
+                        help="Resolution to benchmark (repeatable), all by default")
+    parser.add_argument("--detection-width", type=int, default=640,
+                        help="Width of the image given to the face detector, for face_detection_scaled")
+    parser.add_argument("--output", default="bench_gaze_tracking.json")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        raise SystemExit(f"No fixture images found in {args.fixtures}")
+    names = [name for name, _ in fixtures]
+
+    stage_samples = StageSamples()
+    gaze = GazeTracking(detection_width=args.detection_width, metrics=stage_samples)
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "opencv": cv2.__version__,
+            "dlib": dlib.__version__,
+            "numpy": np.__version__,
+        },
+        "iterations": args.iterations,
+        "fixtures": names,
+        "resolutions": {},
+    }
+
+    for name in args.resolution or list(RESOLUTIONS):
+        size = RESOLUTIONS[name]
+        frames = [cv2.resize(frame, size, interpolation=cv2.INTER_AREA) for _, frame in fixtures]
+        stages = benchmark_resolution(gaze, stage_samples, names, frames, args.iterations)
+        results["resolutions"][name] = stages
+
+        print(f"\n{name} ({size[0]}x{size[1]})")
+        print(f"{'stage':<24}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'fps':>10}")
+        for stage, stats in stages.items():
+            print(f"{stage:<24}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['fps']:>10.1f}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
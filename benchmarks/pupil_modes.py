@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Accuracy versus latency of the pupil detection modes
+Runs the accurate and fast modes of Pupil on the same eye frames and
+reports, for each mode, the latency percentiles, the detection rate and
+the pupil position error, to choose a mode per deployment.
+
+With recorded fixtures (a video or a folder of face images), the eye
+frames are isolated by GazeTracking and each mode is calibrated on them
+as it would be live. The error is then measured against the accurate
+mode. Without fixtures, synthetic eye frames with a known pupil position
+are used, and both modes are measured against it.
+
+Usage:
+    python benchmarks/pupil_modes.py [--fixtures VIDEO_OR_DIR] [--iterations N] [--output FILE]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from gaze_tracking.calibration import Calibration
+from gaze_tracking.pupil import Pupil
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def synthetic_eyes(count, seed=0):
+    """Returns synthetic eye frames, as Eye._isolate crops them, with the
+    position of their pupil: a dark iris on a light sclera, surrounded by
+    the white mask
+    """
+    rng = np.random.default_rng(seed)
+    eyes = []
+    for _ in range(count):
+        width, height = rng.integers(40, 70), rng.integers(18, 30)
+        frame = np.full((height, width), 255, np.uint8)
+        sclera = np.zeros_like(frame)
+        cv2.ellipse(sclera, (width // 2, height // 2), (width // 2 - 5, height // 2 - 5), 0, 0, 360, 255, -1)
+
+        iris = np.full_like(frame, int(rng.integers(150, 210)))
+        center = (int(rng.integers(width // 2 - 8, width // 2 + 9)), int(rng.integers(height // 2 - 2, height // 2 + 3)))
+        cv2.circle(iris, center, int(rng.integers(5, 8)), int(rng.integers(20, 60)), -1)
+        noise = rng.normal(0, 6, frame.shape)
+        iris = np.clip(cv2.GaussianBlur(iris, (3, 3), 0) + noise, 0, 255).astype(np.uint8)
+
+        frame[sclera > 0] = iris[sclera > 0]
+        eyes.append((frame, center))
+    return eyes
+
+
+def read_fixtures(source):
+    """Yields the frames of a video file, or of a folder of images sorted by name"""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                frame = cv2.imread(os.path.join(source, name))
+                if frame is not None:
+                    yield frame
+        return
+
+    capture = cv2.VideoCapture(source)
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+
+def recorded_eyes(source):
+    """Returns the eye frames of the recorded fixtures, isolated by GazeTracking"""
+    from gaze_tracking import GazeTracking
+
+    gaze = GazeTracking()
+    eyes = []
+    for frame in read_fixtures(source):
+        gaze.refresh(frame)
+        if gaze.eye_left is not None and gaze.eye_right is not None:
+            eyes += [(gaze.eye_left.frame, None), (gaze.eye_right.frame, None)]
+    return eyes
+
+
+def calibrate(eyes, mode):
+    """Returns the threshold of a mode, calibrated on the first eye frames as GazeTracking does"""
+    calibration = Calibration(mode=mode)
+    for frame, _ in eyes[:calibration.nb_frames]:
+        calibration.evaluate(frame, 0)
+    return calibration.threshold(0)
+
+
+def run_mode(eyes, mode, threshold, iterations):
+    """Detects the pupil of every eye frame, and times the detection"""
+    positions = []
+    samples = []
+    for frame, _ in eyes:
+        pupil = Pupil(frame, threshold, mode)
+        positions.append(None if pupil.x is None else (pupil.x, pupil.y))
+
+    for i in range(iterations):
+        frame = eyes[i % len(eyes)][0]
+        start = time.perf_counter()
+        Pupil(frame, threshold, mode)
+        samples.append(time.perf_counter() - start)
+    return positions, np.asarray(samples) * 1e6
+
+
+def errors(positions, references):
+    """Returns the distances, in pixels, between the detected positions and the references"""
+    pairs = [(p, r) for p, r in zip(positions, references) if p is not None and r is not None]
+    if not pairs:
+        return np.zeros(0)
+    detected, expected = np.array(pairs, float).transpose(1, 0, 2)
+    return np.hypot(*(detected - expected).T)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="Recorded video, or folder of face images")
+    parser.add_argument("--synthetic", type=int, default=500, help="Number of synthetic eye frames without fixtures")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", default="bench_pupil_modes.json")
+    args = parser.parse_args()
+
+    eyes = recorded_eyes(args.fixtures) if args.fixtures else synthetic_eyes(args.synthetic)
+    if not eyes:
+        raise SystemExit(f"No eyes found in {args.fixtures}")
+
+    # Without ground truth, the accurate mode is the reference
+    references = [center for _, center in eyes]
+    reference_name = "ground truth" if args.fixtures is None else Pupil.ACCURATE
+
+    results = {"fixtures": args.fixtures or "synthetic", "eye_frames": len(eyes), "reference": reference_name, "modes": {}}
+    detections = {}
+    for mode in Pupil.MODES:
+        threshold = calibrate(eyes, mode)
+        positions, latencies = run_mode(eyes, mode, threshold, args.iterations)
+        detections[mode] = positions
+        results["modes"][mode] = {
+            "threshold": threshold,
+            "detection_rate": sum(p is not None for p in positions) / len(positions),
+            "p50_us": float(np.percentile(latencies, 50)),
+            "p95_us": float(np.percentile(latencies, 95)),
+            "mean_us": float(np.mean(latencies)),
+        }
+
+    if args.fixtures is not None:
+        references = detections[Pupil.ACCURATE]
+    for mode in Pupil.MODES:
+        distances = errors(detections[mode], references)
+        stats = results["modes"][mode]
+        stats["mean_error_px"] = float(np.mean(distances)) if len(distances) else None
+        stats["p95_error_px"] = float(np.percentile(distances, 95)) if len(distances) else None
+
+    print(f"{len(eyes)} eye frames ({results['fixtures']}), error against the {reference_name}")
+    print(f"{'mode':<10}{'threshold':>10}{'detected':>10}{'p50 (us)':>10}{'p95 (us)':>10}{'error (px)':>12}{'p95 err':>10}")
+    for mode, stats in results["modes"].items():
+        error = "-" if stats["mean_error_px"] is None else f"{stats['mean_error_px']:.2f}"
+        p95_error = "-" if stats["p95_error_px"] is None else f"{stats['p95_error_px']:.2f}"
+        print(f"{mode:<10}{stats['threshold']:>10}{stats['detection_rate'] * 100:>9.1f}%"
+              f"{stats['p50_us']:>10.1f}{stats['p95_us']:>10.1f}{error:>12}{p95_error:>10}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
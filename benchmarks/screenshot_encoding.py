@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the screenshot encoding
+Compares the resize and encode time and the base64 payload size of the
+previous disk round trip PNG with the in-memory PNG, JPEG and WebP
+encodings, with and without a byte budget.
+
+Usage:
+    python benchmarks/screenshot_encoding.py [--iterations N] [--image screenshot.png]
+"""
+
+import argparse
+import base64
+import os
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from focuson.productivity import encode_screenshot
+
+
+def synthetic_screenshot(width=2560, height=1440):
+    """Returns a screenshot-like image: window chrome, flat panels and lines of text"""
+    image = Image.new("RGB", (width, height), (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, width, 60), fill=(60, 63, 65))
+    draw.rectangle((0, 60, 400, height), fill=(43, 43, 43))
+    for line in range(0, height - 80, 24):
+        indent = 420 + (line // 24 % 6) * 30
+        text = "def analyze(frame, threshold=%d):  # line %d" % (line % 97, line // 24)
+        draw.text((indent, 80 + line), text, fill=(169 + line % 80, 183, 198))
+    return image
+
+
+def disk_png(image):
+    """Previous encoding: PNG saved to a temporary file and read back"""
+    temp_path = "temp_screenshot.png"
+    image.save(temp_path, optimize=True, quality=85)
+    with open(temp_path, "rb") as image_file:
+        encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
+    os.remove(temp_path)
+    return encoded_string
+
+
+def resize(image, resample):
+    """Resizes the screenshot to fit in 1280x720, like grab_screenshot"""
+    ratio = min(1280 / image.width, 720 / image.height)
+    return image.resize((int(image.width * ratio), int(image.height * ratio)), resample)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--image", help="Real screenshot to use instead of a synthetic one")
+    args = parser.parse_args()
+
+    screenshot = Image.open(args.image).convert("RGB") if args.image else synthetic_screenshot()
+
+    print(f"{'resize filter':<16}{'time (ms)':>12}")
+    for name, resample in (("LANCZOS", Image.LANCZOS), ("BILINEAR", Image.BILINEAR)):
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            resize(screenshot, resample)
+        print(f"{name:<16}{(time.perf_counter() - start) / args.iterations * 1000:>12.1f}")
+
+    resized = resize(screenshot, Image.LANCZOS)
+    encoders = [
+        ("PNG (disk)", lambda: disk_png(resized)),
+        ("PNG", lambda: encode_screenshot(resized, "PNG")),
+        ("JPEG q85", lambda: encode_screenshot(resized, "JPEG", 85)),
+        ("JPEG 100 KB", lambda: encode_screenshot(resized, "JPEG", 85, max_bytes=100000)),
+        ("WEBP q80", lambda: encode_screenshot(resized, "WEBP", 80)),
+        ("WEBP 60 KB", lambda: encode_screenshot(resized, "WEBP", 80, max_bytes=60000)),
+    ]
+
+    print(f"\n{'format':<16}{'time (ms)':>12}{'payload (KB)':>15}")
+    for name, encode in encoders:
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            payload = encode()
+        elapsed = (time.perf_counter() - start) / args.iterations * 1000
+        print(f"{name:<16}{elapsed:>12.1f}{len(payload) / 1024:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,68 +4,68 @@ FocusON Session Comparison Tool
 Compares multiple sessions from the reports folder
 """
 
-import json
 import os
+import argparse
 from datetime import datetime
+import time
+from focuson.session_index import SessionIndex
+from focuson.trends import METRICS, compute_trends, save_trends
 
-def compare_sessions():
-    """Compare all sessions in the reports folder"""
-    reports_dir = "reports"
-    
+
+def parse_date(text):
+    """Returns the timestamp of a YYYY-MM-DD date, None if it is not set"""
+    return datetime.strptime(text, "%Y-%m-%d").timestamp() if text else None
+
+
+def compare_sessions(reports_dir="reports", since=None, until=None, rescan=False):
+    """Compare the sessions in the reports folder
+
+    Arguments:
+        reports_dir (str): Folder of the session reports
+        since (float): Timestamp from which sessions are compared
+        until (float): Timestamp before which sessions are compared
+        rescan (bool): Parse every session report again, not only the new or changed ones
+    """
     if not os.path.exists(reports_dir):
         print("No reports folder found. Run FocusON first to generate sessions.")
         return
     
-    # Find all session folders
-    session_folders = [f for f in os.listdir(reports_dir) if f.startswith("session_")]
-    
-    if len(session_folders) < 2:
-        print(f"Found {len(session_folders)} session(s). Need at least 2 sessions to compare.")
-        return
-    
-    sessions = []
-    
-    for folder in session_folders:
-        data_file = os.path.join(reports_dir, folder, "session_data.json")
-        if os.path.exists(data_file):
-            try:
-                with open(data_file, 'r') as f:
-                    data = json.load(f)
-                    sessions.append({
-                        'folder': folder,
-                        'data': data,
-                        'start_time': data.get('start_time', 0)
-                    })
-            except Exception as e:
-                print(f"Error loading {data_file}: {e}")
+    # Sessions are read from the index, which only parses new or changed session folders
+    index = SessionIndex(reports_dir)
+    index.refresh(full=rescan)
+    sessions = index.sessions(since, until)
+    summary = index.aggregate(since, until)
+    index.close()
     
     if len(sessions) < 2:
-        print("Need at least 2 valid session files to compare.")
+        print(f"Found {len(sessions)} session(s). Need at least 2 sessions to compare.")
         return
     
-    # Sort by start time
-    sessions.sort(key=lambda x: x['start_time'])
-    
     # Generate comparison report
     print("\n" + "="*80)
     print("                           FOCUSON SESSION COMPARISON")
     print("="*80)
     
-    for i, session in enumerate(sessions, 1):
-        data = session['data']
+    for i, data in enumerate(sessions, 1):
         session_date = datetime.fromtimestamp(data['start_time']).strftime("%Y-%m-%d %H:%M")
         
         print(f"\n📊 SESSION {i} - {session_date}:")
         print(f"   • Duration: {data.get('duration', 0)/60:.1f} minutes")
         print(f"   • Focus Score: {data.get('avg_focus_score', 0):.1f}/100")
         print(f"   • Productivity: {data.get('productivity_percentage', 0):.1f}%")
-        print(f"   • Total Blinks: {data.get('blink_count', 0)}")
-        print(f"   • Distractions: {data.get('distraction_count', 0)}")
+        print(f"   • Total Blinks: {data['blink_count']:.0f}")
+        print(f"   • Distractions: {data['distraction_count']:.0f}")
+    
+    print(f"\n📋 OVERALL ({summary['sessions']} sessions):")
+    print(f"   • Total Duration: {(summary['total_duration'] or 0)/3600:.1f} hours")
+    print(f"   • Average Focus Score: {summary['avg_focus_score'] or 0:.1f}/100 "
+          f"(min {summary['min_focus_score'] or 0:.1f}, max {summary['max_focus_score'] or 0:.1f})")
+    print(f"   • Average Productivity: {summary['avg_productivity'] or 0:.1f}%")
     
     # Calculate improvements
     if len(sessions) >= 2:
-        first = sessions[0]['data']
-        last = sessions[-1]['data']
+        first = sessions[0]
+        last = sessions[-1]
         
         focus_change = last.get('avg_focus_score', 0) - first.get('avg_focus_score', 0)
         productivity_change = last.get('productivity_percentage', 0) - first.get('productivity_percentage', 0)
@@ -83,5 +83,72 @@ def compare_sessions():
     
     print("\n" + "="*80)
 
+def session_trends(reports_dir="reports", since=None, until=None, rescan=False, window=7, output_dir=None):
+    """Computes the trends of the focus score and productivity over the
+    session history, and writes them as CSV and JSON files
+
+    Arguments:
+        reports_dir (str): Folder of the session reports
+        since (float): Timestamp from which sessions are included
+        until (float): Timestamp before which sessions are included
+        rescan (bool): Parse every session report again, not only the new or changed ones
+        window (int): Number of sessions of the rolling averages
+        output_dir (str): Folder of the CSV and JSON files, trends in the reports folder by default
+    """
+    if not os.path.exists(reports_dir):
+        print("No reports folder found. Run FocusON first to generate sessions.")
+        return
+    
+    start = time.perf_counter()
+    index = SessionIndex(reports_dir)
+    index.refresh(full=rescan)
+    arrays = index.arrays(('start_time',) + METRICS, since, until)
+    index.close()
+    
+    start_times = arrays.pop('start_time')
+    if len(start_times) < 2:
+        print(f"Found {len(start_times)} session(s). Need at least 2 sessions to compute trends.")
+        return
+    
+    # A window longer than the history would leave every rolling average NaN
+    window = min(window, len(start_times))
+    trends = compute_trends(start_times, arrays, window)
+    files = save_trends(trends, start_times, arrays, output_dir or os.path.join(reports_dir, "trends"))
+    elapsed = time.perf_counter() - start
+    
+    print("\n" + "="*80)
+    print("                           FOCUSON SESSION TRENDS")
+    print("="*80)
+    print(f"\n📊 {trends['sessions']} sessions over {len(trends['weeks'])} weeks")
+    
+    for name, label in zip(METRICS, ("Focus Score", "Productivity")):
+        percentiles = trends['percentiles'][name]
+        regression = trends['regression'][name]
+        weekly_delta = trends['weekly_delta'][name]
+        print(f"\n📈 {label.upper()}:")
+        print(f"   • Median: {percentiles[50]:.1f} (10th percentile {percentiles[10]:.1f}, 90th {percentiles[90]:.1f})")
+        print(f"   • Last {window} sessions average: {trends['rolling'][name][-1]:.1f}")
+        print(f"   • Trend: {regression['slope_per_day'] * 7:+.2f} per week (R² {regression['r_squared']:.2f})")
+        if len(weekly_delta) > 1:
+            print(f"   • Last week change: {weekly_delta[-1]:+.1f}")
+    
+    print(f"\n💾 Saved to: {', '.join(files)}")
+    print(f"⏱️  Computed in {elapsed * 1000:.0f} ms")
+    print("\n" + "="*80)
+
 if __name__ == "__main__":
-    compare_sessions() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Compares the FocusON sessions of the reports folder")
+    parser.add_argument("--reports-dir", default="reports")
+    parser.add_argument("--since", help="First day of the sessions to compare (YYYY-MM-DD)")
+    parser.add_argument("--until", help="Day after the last sessions to compare (YYYY-MM-DD)")
+    parser.add_argument("--rescan", action="store_true", help="Parse every session report again")
+    parser.add_argument("--trend", action="store_true",
+                        help="Compute rolling averages, weekly changes, percentiles and regressions instead")
+    parser.add_argument("--window", type=int, default=7, help="Number of sessions of the rolling averages")
+    parser.add_argument("--output", help="Folder of the trend CSV and JSON files (default: reports/trends)")
+    args = parser.parse_args()
+    if args.trend:
+        session_trends(args.reports_dir, parse_date(args.since), parse_date(args.until), args.rescan,
+                       args.window, args.output)
+    else:
+        compare_sessions(args.reports_dir, parse_date(args.since), parse_date(args.until), args.rescan) 
\ No newline at end of file
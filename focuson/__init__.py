@@ -0,0 +1,14 @@
+from .capture import FrameGrabber
+from .productivity import ProductivityWorker
+from .screenshot_cache import ScreenshotCache
+from .serial_output import SerialOutput
+from .hud import Hud
+from .session import FocusSession
+from .focus_score import FocusScore
+from .metrics import Metrics
+from .recorder import SessionRecorder
+from .blink_rate import BlinkRate
+from .session_index import SessionIndex
+from .classifier import ClassifierChain, WindowRules, WindowTier, ScreenFeaturesTier
+from .classifier import WindowProvider, SystemWindowProvider, FakeWindowProvider
+from .api_client import ApiClient, TokenBucket
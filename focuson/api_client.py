@@ -0,0 +1,199 @@
+import os
+import random
+import threading
+import time
+
+# Status codes after which a request is retried
+RETRY_STATUSES = (408, 409, 429, 500, 502, 503, 504)
+
+
+class TokenBucket(object):
+    """
+    This class limits the rate of the requests: tokens are added at a
+    fixed rate up to a burst capacity, and each request takes one.
+    Callers that find the bucket empty reserve the next token and sleep
+    until it is available, in the order they arrived.
+    """
+
+    def __init__(self, rate, capacity=1):
+        """
+        Arguments:
+            rate (float): Tokens added per second
+            capacity (int): Maximum number of tokens, requests allowed in a burst
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.waited = 0.0  # Total time spent waiting for a token, in seconds
+
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Takes a token, waiting for it if needed. Returns False, without
+        taking it, if it would not be available within the timeout.
+
+        Argument:
+            timeout (float): Maximum time to wait, in seconds, unlimited by default
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            wait = max(1 - self._tokens, 0) / self.rate
+            if timeout is not None and wait > timeout:
+                return False
+            # The token is reserved now, the tokens of later callers come after it
+            self._tokens -= 1
+            self.waited += wait
+
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+
+class ApiClient(object):
+    """
+    This class wraps one OpenAI client shared by all the requests of the
+    process, so that HTTP connections are kept alive and reused. Requests
+    go through a token bucket, and the ones that fail with a rate limit,
+    a server error or a connection error are retried after a jittered
+    exponential backoff, within the timeout of the request.
+    """
+
+    def __init__(self, api_key=None, base_url=None, model="gpt-4.1-mini", rate=1.0, burst=5, max_retries=4,
+                 backoff_base=0.5, backoff_max=20.0, metrics=None):
+        """
+        Arguments:
+            api_key (str): OpenAI API key, OPENAI_API_KEY by default
+            base_url (str): URL of the API, OPENAI_BASE_URL or the OpenAI API by default
+            model (str): Model of the completions
+            rate (float): Maximum number of requests per second, None for no limit
+            burst (int): Number of requests allowed at once above the rate
+            max_retries (int): Number of retries of a failed request
+            backoff_base (float): Upper bound of the first backoff, in seconds
+            backoff_max (float): Upper bound of the backoffs, in seconds
+            metrics (metrics.Metrics): Records the latency of the requests and counts the retries
+        """
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.base_url = base_url or os.getenv('OPENAI_BASE_URL')
+        self.model = model
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = metrics
+        self.requests = 0
+        self.retries = 0
+
+        self._client = None
+        self._lock = threading.Lock()  # Guards the client and the counters
+
+    @property
+    def client(self):
+        """OpenAI client, created on first use. Its connection pool is shared by all threads."""
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI  # Imported on first use, it takes seconds to import
+                # Retries are handled here, within the rate limit
+                self._client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            return self._client
+
+    def close(self):
+        """Closes the pooled connections"""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def backoff(self, attempt, retry_after=None):
+        """Returns the time to wait before a retry: a random time up to an
+        exponentially growing bound ("full jitter"), so that stations
+        sharing an API key do not retry in lockstep, and at least the
+        Retry-After time given by the server.
+
+        Arguments:
+            attempt (int): Number of the retry, from 0
+            retry_after (float): Time requested by the server, in seconds
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0)
+
+    @staticmethod
+    def _retry_after(error):
+        """Returns the Retry-After time of a failed response in seconds, or None"""
+        response = getattr(error, "response", None)
+        try:
+            return float(response.headers.get("retry-after"))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def complete(self, content, max_tokens=50, timeout=None):
+        """Sends a user message and returns the text of the completion.
+        Raises the last error once the retries or the timeout are exhausted.
+
+        Arguments:
+            content (list): Parts of the user message, text and images
+            max_tokens (int): Maximum length of the completion
+            timeout (float): Time after which the request is abandoned, retries included, in seconds
+        """
+        import openai
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        attempt = 0
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if self.bucket is not None and not self.bucket.acquire(remaining):
+                raise TimeoutError("Rate limit: no request allowed before the timeout")
+
+            start = time.perf_counter()
+            try:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0.001)
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": content}],
+                    max_tokens=max_tokens,
+                    timeout=remaining,
+                )
+                with self._lock:
+                    self.requests += 1
+                if self.metrics is not None:
+                    self.metrics.observe("api_request", time.perf_counter() - start)
+                return response.choices[0].message.content.strip()
+            except (openai.APIStatusError, openai.APIConnectionError) as e:
+                status = getattr(e, "status_code", None)
+                if (status is not None and status not in RETRY_STATUSES) or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt, self._retry_after(e))
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            if self.metrics is not None:
+                self.metrics.increment("api_retries")
+            time.sleep(delay)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_client(metrics=None):
+    """Returns the ApiClient shared by the whole process, created on first
+    call. FOCUSON_API_RATE sets its maximum number of requests per second,
+    to split the rate limit of an API key between stations.
+
+    Argument:
+        metrics (metrics.Metrics): Records the latency of the requests and counts the retries,
+            attached to the shared client if it has none yet
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ApiClient(rate=float(os.getenv('FOCUSON_API_RATE', "1.0")), metrics=metrics)
+        elif metrics is not None and _shared.metrics is None:
+            _shared.metrics = metrics
+        return _shared
@@ -0,0 +1,77 @@
+class BlinkRate(object):
+    """
+    This class measures the blink rate over sliding time windows. Blink
+    timestamps are kept in a ring buffer, and each window keeps the index
+    of its oldest blink, which only moves forward: adding a blink and
+    updating the windows are O(1) amortized per frame, whatever the
+    length of the windows.
+    """
+
+    def __init__(self, windows=(15, 60, 300), start_time=0.0, capacity=1024):
+        """
+        Arguments:
+            windows (tuple): Lengths of the sliding windows, in seconds
+            start_time (float): Timestamp of the beginning of the measure
+            capacity (int): Number of blink timestamps kept, must exceed the blinks of the longest window
+        """
+        self.windows = tuple(windows)
+        self.start_time = start_time
+        self.total = 0  # Blinks added since the beginning
+
+        self._times = [0.0] * capacity
+        self._capacity = capacity
+        self._tails = {window: 0 for window in self.windows}  # Index of the oldest blink of each window
+
+    def add(self, timestamp):
+        """Records a blink
+
+        Argument:
+            timestamp (float): Time of the blink
+        """
+        self._times[self.total % self._capacity] = timestamp
+        self.total += 1
+
+        # The oldest timestamp was overwritten, windows can no longer hold it
+        oldest = self.total - self._capacity
+        if oldest > 0:
+            for window, tail in self._tails.items():
+                if tail < oldest:
+                    self._tails[window] = oldest
+
+    def advance(self, current_time):
+        """Drops the blinks that left each window
+
+        Argument:
+            current_time (float): Timestamp of the frame
+        """
+        times = self._times
+        capacity = self._capacity
+        for window, tail in self._tails.items():
+            limit = current_time - window
+            while tail < self.total and times[tail % capacity] <= limit:
+                tail += 1
+            self._tails[window] = tail
+
+    def count(self, window):
+        """Returns the number of blinks in a window, as of the last advance()"""
+        return self.total - self._tails[window]
+
+    def elapsed(self, window, current_time):
+        """Returns the time covered by a window, shorter than the window at the beginning"""
+        return max(0.0, min(window, current_time - self.start_time))
+
+    def rate(self, window, current_time):
+        """Returns the blinks per minute over a window
+
+        Arguments:
+            window (float): One of the windows of the measure
+            current_time (float): Timestamp of the frame
+        """
+        elapsed = self.elapsed(window, current_time)
+        if elapsed <= 0:
+            return 0
+        return self.count(window) / elapsed * 60
+
+    def rates(self, current_time):
+        """Returns the blinks per minute over every window"""
+        return {window: self.rate(window, current_time) for window in self.windows}
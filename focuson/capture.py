@@ -0,0 +1,94 @@
+import collections
+import threading
+import time
+
+
+class FrameGrabber(object):
+    """
+    This class reads a cv2.VideoCapture on its own thread into a small
+    ring buffer, so that the analysis loop always gets the freshest
+    frame instead of the ones queued up in the driver.
+    When the buffer is full, the oldest frame is dropped.
+    """
+
+    def __init__(self, capture, buffer_size=2):
+        """
+        Arguments:
+            capture (cv2.VideoCapture): Opened video source
+            buffer_size (int): Maximum number of frames kept in the buffer
+        """
+        self.capture = capture
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+
+        self._frames = collections.deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the capture thread and returns the grabber"""
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        """Reads frames until the grabber is stopped or the source is exhausted"""
+        while self._running:
+            ok, frame = self.capture.read()
+            timestamp = time.monotonic()
+
+            with self._condition:
+                if not ok:
+                    self._running = False
+                elif len(self._frames) == self._frames.maxlen:
+                    self.frames_dropped += 1
+
+                if ok:
+                    self._frames.append((timestamp, frame))
+                    self.frames_captured += 1
+                self._condition.notify_all()
+
+    def read(self, timeout=None):
+        """Returns the most recent frame that has not been read yet,
+        waiting for it if needed. Older unread frames are dropped.
+        Like cv2.VideoCapture.read, returns a (success, frame) tuple.
+
+        Argument:
+            timeout (float): Maximum time to wait for a frame, in seconds
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._frames or not self._running, timeout)
+            if not self._frames:
+                return False, None
+
+            timestamp, frame = self._frames.pop()
+            self.frames_dropped += len(self._frames)
+            self._frames.clear()
+
+        self.latency = time.monotonic() - timestamp
+        self.max_latency = max(self.max_latency, self.latency)
+        return True, frame
+
+    def stats(self):
+        """Returns the capture counters as a dictionary"""
+        return {
+            'frames_captured': self.frames_captured,
+            'frames_dropped': self.frames_dropped,
+            'latency': self.latency,
+            'max_latency': self.max_latency,
+        }
+
+    def release(self):
+        """Stops the capture thread and releases the video source"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.capture.release()
@@ -0,0 +1,352 @@
+import abc
+import collections
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+from PIL import Image
+
+PRODUCTIVE = "PRODUCTIVE"
+NON_PRODUCTIVE = "NON-PRODUCTIVE"
+
+# Title and process name of the active window, either may be empty
+WindowInfo = collections.namedtuple("WindowInfo", ["title", "process"])
+
+
+class WindowProvider(abc.ABC):
+    """
+    Interface of the sources of the active window. active_window()
+    returns a WindowInfo, or None when the window cannot be read.
+    """
+
+    @abc.abstractmethod
+    def active_window(self):
+        """Returns the WindowInfo of the active window, or None"""
+
+
+class FakeWindowProvider(WindowProvider):
+    """
+    This class stands for the active window in tests and replays: it
+    returns windows from a fixed sequence, in turn.
+    """
+
+    def __init__(self, windows=()):
+        """
+        Argument:
+            windows (iterable): WindowInfo, or (title, process) tuples, returned in turn
+        """
+        self.windows = [WindowInfo(*window) for window in windows]
+        self.calls = 0
+
+    def active_window(self):
+        if not self.windows:
+            return None
+        window = self.windows[self.calls % len(self.windows)]
+        self.calls += 1
+        return window
+
+
+class SystemWindowProvider(WindowProvider):
+    """
+    This class reads the active window of the desktop: with the Win32 API
+    on Windows, System Events on macOS and xprop on X11.
+    """
+
+    def __init__(self, timeout=1.0):
+        """
+        Argument:
+            timeout (float): Time after which the helper commands are abandoned, in seconds
+        """
+        self.timeout = timeout
+
+    def active_window(self):
+        try:
+            if sys.platform == "win32":
+                return self._windows()
+            if sys.platform == "darwin":
+                return self._macos()
+            return self._x11()
+        except (OSError, ValueError, IndexError, subprocess.SubprocessError):
+            return None
+
+    @staticmethod
+    def _windows():
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        hwnd = user32.GetForegroundWindow()
+        if not hwnd:
+            return None
+
+        title = ctypes.create_unicode_buffer(user32.GetWindowTextLengthW(hwnd) + 1)
+        user32.GetWindowTextW(hwnd, title, len(title))
+
+        pid = wintypes.DWORD()
+        user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        process = ""
+        handle = kernel32.OpenProcess(0x1000, False, pid.value)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if handle:
+            path = ctypes.create_unicode_buffer(1024)
+            size = wintypes.DWORD(len(path))
+            if kernel32.QueryFullProcessImageNameW(handle, 0, path, ctypes.byref(size)):
+                process = os.path.basename(path.value)
+            kernel32.CloseHandle(handle)
+        return WindowInfo(title.value, process)
+
+    def _macos(self):
+        script = (
+            'tell application "System Events"\n'
+            '  set frontApp to first application process whose frontmost is true\n'
+            '  set windowTitle to ""\n'
+            '  try\n'
+            '    set windowTitle to name of front window of frontApp\n'
+            '  end try\n'
+            '  return (name of frontApp) & linefeed & windowTitle\n'
+            'end tell'
+        )
+        output = subprocess.run(["osascript", "-e", script], capture_output=True, text=True,
+                                timeout=self.timeout, check=True).stdout
+        process, _, title = output.rstrip("\n").partition("\n")
+        return WindowInfo(title, process)
+
+    def _x11(self):
+        def xprop(*args):
+            return subprocess.run(["xprop"] + list(args), capture_output=True, text=True,
+                                  timeout=self.timeout, check=True).stdout
+
+        # _NET_ACTIVE_WINDOW(WINDOW): window id # 0x3a00007
+        window_id = xprop("-root", "_NET_ACTIVE_WINDOW").split()[-1]
+        if int(window_id, 16) == 0:
+            return None
+
+        title, process = "", ""
+        for line in xprop("-id", window_id, "_NET_WM_NAME", "_NET_WM_PID").splitlines():
+            name, _, value = line.partition(" = ")
+            if name.startswith("_NET_WM_NAME") and value:
+                title = value.strip().strip('"')
+            elif name.startswith("_NET_WM_PID") and value.strip().isdigit():
+                try:
+                    with open(f"/proc/{value.strip()}/comm") as f:
+                        process = f.read().strip()
+                except OSError:
+                    pass
+        return WindowInfo(title, process)
+
+
+class WindowRules(object):
+    """
+    This class holds the user-maintained allowlist and denylist of the
+    active window. Title rules match whole words of the window title,
+    whatever the case. Process rules match the whole process name,
+    whatever the case and with or without ".exe", so that "Outlook" or
+    "Steam" do not match every title mentioning them. Windows matching
+    both lists, or none, are left to the next tier.
+    """
+
+    def __init__(self, productive=(), non_productive=(), productive_processes=(), non_productive_processes=()):
+        """
+        Arguments:
+            productive (iterable): Allowlist of words or phrases of the window title
+            non_productive (iterable): Denylist of words or phrases of the window title
+            productive_processes (iterable): Allowlist of process names
+            non_productive_processes (iterable): Denylist of process names
+        """
+        self.productive = list(productive)
+        self.non_productive = list(non_productive)
+        self.productive_processes = {self._process_name(name) for name in productive_processes if name}
+        self.non_productive_processes = {self._process_name(name) for name in non_productive_processes if name}
+        # One regular expression per list, a window is matched in microseconds
+        self._productive = self._compile(self.productive)
+        self._non_productive = self._compile(self.non_productive)
+
+    @staticmethod
+    def _compile(rules):
+        rules = [rule for rule in rules if rule]
+        if not rules:
+            return None
+        # Lookarounds rather than \b, so that rules may begin or end with a symbol ("Disney+")
+        return re.compile(r"(?<!\w)(?:" + "|".join(re.escape(rule) for rule in rules) + r")(?!\w)", re.IGNORECASE)
+
+    @staticmethod
+    def _process_name(name):
+        name = name.lower()
+        return name[:-4] if name.endswith(".exe") else name
+
+    @classmethod
+    def load(cls, path):
+        """Returns the rules of a JSON file with "productive" and "non_productive"
+        title lists, and "productive_processes" and "non_productive_processes" lists
+        """
+        with open(path, 'r') as f:
+            rules = json.load(f)
+        return cls(rules.get("productive", ()), rules.get("non_productive", ()),
+                   rules.get("productive_processes", ()), rules.get("non_productive_processes", ()))
+
+    def match(self, window):
+        """Returns the verdict of a window, or None if the rules do not decide
+
+        Argument:
+            window (WindowInfo): Active window
+        """
+        if window is None:
+            return None
+        process = self._process_name(window.process or "")
+        productive = process in self.productive_processes or \
+            (self._productive is not None and self._productive.search(window.title or "") is not None)
+        non_productive = process in self.non_productive_processes or \
+            (self._non_productive is not None and self._non_productive.search(window.title or "") is not None)
+        if productive == non_productive:
+            return None
+        return PRODUCTIVE if productive else NON_PRODUCTIVE
+
+
+class WindowTier(object):
+    """
+    This tier decides from the active window, matched against the
+    allowlist and denylist. No screenshot is needed.
+    """
+
+    name = "window"
+
+    def __init__(self, provider, rules):
+        """
+        Arguments:
+            provider (WindowProvider): Source of the active window
+            rules (WindowRules): Allowlist and denylist
+        """
+        self.provider = provider
+        self.rules = rules
+
+    def classify(self, screenshot):
+        return self.rules.match(self.provider.active_window())
+
+
+def screen_features(image, size=(160, 90)):
+    """Returns the share of the screen covered by its dominant gray level
+    (the background of documents, mail and code editors) and its mean
+    colorfulness, between 0.0 and 1.0, measured on a thumbnail
+
+    Arguments:
+        image (PIL.Image.Image): Screenshot
+        size (tuple): Size of the thumbnail
+    """
+    thumbnail = image.resize(size, Image.NEAREST).convert("RGB")
+    # Gray levels in bins of 8, so that anti-aliasing and noise stay in the background
+    histogram = thumbnail.convert("L").histogram()
+    background = max(sum(histogram[i:i + 8]) for i in range(0, 256, 8)) / (size[0] * size[1])
+    # Channels as separate planes, reductions over the last axis of an (h, w, 3) array are slow
+    red, green, blue = (np.asarray(channel, np.int16) for channel in thumbnail.split())
+    colorfulness = (np.maximum(np.maximum(red, green), blue) - np.minimum(np.minimum(red, green), blue)).mean() / 255
+    return float(background), float(colorfulness)
+
+
+class ScreenFeaturesTier(object):
+    """
+    This tier decides from simple features of the screenshot. Screens
+    with hardly any background and vivid colors (videos, games, photo
+    feeds) are not productive. A flat, gray screen may be a document, mail
+    or code, but also a text feed or a dark video, so that verdict is
+    only given when text_background is set, with thresholds measured on
+    the screens of the user. Anything else is left to the next tier.
+    """
+
+    name = "screen"
+
+    def __init__(self, media_background=0.15, media_colorfulness=0.25, text_background=None, text_colorfulness=0.08):
+        """
+        Arguments:
+            media_background (float): Maximum background share of a non-productive screen
+            media_colorfulness (float): Minimum colorfulness of a non-productive screen
+            text_background (float): Minimum background share of a productive screen,
+                None to never decide that a screen is productive
+            text_colorfulness (float): Maximum colorfulness of a productive screen
+        """
+        self.media_background = media_background
+        self.media_colorfulness = media_colorfulness
+        self.text_background = text_background
+        self.text_colorfulness = text_colorfulness
+
+    def classify(self, screenshot):
+        image = screenshot()
+        if image is None:
+            return None
+        background, colorfulness = screen_features(image)
+        if background <= self.media_background and colorfulness >= self.media_colorfulness:
+            return NON_PRODUCTIVE
+        if self.text_background is not None and background >= self.text_background and \
+           colorfulness <= self.text_colorfulness:
+            return PRODUCTIVE
+        return None
+
+
+class ClassifierChain(object):
+    """
+    This class runs the local productivity tiers in order, cheapest
+    first, and stops at the first one that decides. When none does, the
+    screen is left to the cloud model. Hits and latency are counted per
+    tier.
+    """
+
+    def __init__(self, tiers, metrics=None):
+        """
+        Arguments:
+            tiers (list): Tiers with a name and a classify(screenshot) method, screenshot
+                being a callable returning the PIL screenshot, taken on first call
+            metrics (metrics.Metrics): Counts the verdicts of each tier
+        """
+        self.tiers = list(tiers)
+        self.metrics = metrics
+        self.fallbacks = 0
+
+        self._stats = {tier.name: {'calls': 0, 'hits': 0, 'time': 0.0} for tier in self.tiers}
+        self._lock = threading.Lock()
+
+    def classify(self, screenshot):
+        """Returns the verdict of the first tier that decides, or None
+
+        Argument:
+            screenshot (callable): Returns the PIL screenshot, or None on failure
+        """
+        for tier in self.tiers:
+            start = time.perf_counter()
+            verdict = tier.classify(screenshot)
+            duration = time.perf_counter() - start
+
+            with self._lock:
+                stats = self._stats[tier.name]
+                stats['calls'] += 1
+                stats['time'] += duration
+                if verdict is not None:
+                    stats['hits'] += 1
+            if verdict is not None:
+                if self.metrics is not None:
+                    self.metrics.increment(f"productivity_{tier.name}_hits")
+                return verdict
+
+        with self._lock:
+            self.fallbacks += 1
+        if self.metrics is not None:
+            self.metrics.increment("productivity_fallbacks")
+        return None
+
+    def stats(self):
+        """Returns the calls, hits, hit rate and mean latency of each tier,
+        and the number of screens left to the cloud model, as a dictionary
+        """
+        with self._lock:
+            tiers = {
+                name: {
+                    'calls': stats['calls'],
+                    'hits': stats['hits'],
+                    'hit_rate': stats['hits'] / stats['calls'] if stats['calls'] else 0.0,
+                    'mean_us': stats['time'] / stats['calls'] * 1e6 if stats['calls'] else None,
+                }
+                for name, stats in self._stats.items()
+            }
+            return {'tiers': tiers, 'fallbacks': self.fallbacks}
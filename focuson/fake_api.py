@@ -0,0 +1,185 @@
+"""
+Local fake of the OpenAI chat completions endpoint, to run the
+productivity analysis offline.
+
+Usage:
+    python -m focuson.fake_api --port 8765 --verdict NON-PRODUCTIVE --delay 2
+    python -m focuson.fake_api --port 8765 --fail 429 --fail 503 --rate-limit 2
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python focus.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIServer(object):
+    """
+    This class serves a minimal /v1/chat/completions endpoint on a
+    local port. Every request gets the same verdict, once per image of
+    the request, after an optional delay to simulate a slow network
+    round-trip. Connections are kept alive, and rate limits and server
+    errors can be simulated.
+    """
+
+    def __init__(self, verdict="PRODUCTIVE", delay=0.0, host="127.0.0.1", port=0, failures=(), rate_limit=None,
+                 retry_after=None):
+        """
+        Arguments:
+            verdict (str): Content of every completion
+            delay (float): Time waited before answering, in seconds
+            host (str): Interface to listen on
+            port (int): Port to listen on, 0 picks a free one
+            failures (iterable): Status codes returned, in turn, to the first requests
+            rate_limit (float): Requests allowed per second, the others get a 429 status
+            retry_after (float): Retry-After time of the 429 responses, in seconds
+        """
+        self.verdict = verdict
+        self.delay = delay
+        self.failures = list(failures)
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.requests = []
+        self.request_times = []  # Times of the requests answered successfully
+        self.rejected = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """URL to give to the OpenAI client"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        """Returns the request handler class bound to this server"""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the OpenAI API
+            disable_nagle_algorithm = True  # Headers and body are sent apart, Nagle would delay the body by 40 ms
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+
+                status = fake._admit()
+                if status != 200:
+                    headers = {"Retry-After": str(fake.retry_after)} if status == 429 and fake.retry_after else {}
+                    self._send_json(status, {"error": {"message": f"Fake error {status}", "type": "fake", "code": status}},
+                                    headers)
+                    return
+
+                request = json.loads(body or b"{}")
+                fake.requests.append(request)
+                time.sleep(fake.delay)
+                self._send_json(200, {
+                    "id": f"chatcmpl-fake-{len(fake.requests)}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": "fake",
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "\n".join([fake.verdict] * fake.images(request))},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 1, "total_tokens": 1},
+                })
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on the request (timeout or cancellation)
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _admit(self):
+        """Returns the status of a new request: the next simulated failure,
+        429 above the rate limit, 200 otherwise
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.failures:
+                self.rejected += 1
+                return self.failures.pop(0)
+            if self.rate_limit is not None:
+                recent = [t for t in self.request_times if now - t < 1.0]
+                if len(recent) >= self.rate_limit:
+                    self.rejected += 1
+                    return 429
+            self.request_times.append(now)
+            return 200
+
+    @staticmethod
+    def images(request):
+        """Returns the number of images of a chat completion request, at least one"""
+        count = 0
+        for message in request.get("messages", []):
+            content = message.get("content")
+            if isinstance(content, list):
+                count += sum(1 for part in content if part.get("type") == "image_url")
+        return max(count, 1)
+
+    def start(self):
+        """Serves requests on a background thread and returns the server"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="FakeOpenAIServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving requests"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--verdict", default="PRODUCTIVE")
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--fail", type=int, action="append", default=[],
+                        help="Status code returned to the next request, repeat for several")
+    parser.add_argument("--rate-limit", type=float, help="Requests allowed per second")
+    parser.add_argument("--retry-after", type=float, help="Retry-After time of the 429 responses, in seconds")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.verdict, args.delay, args.host, args.port, args.fail, args.rate_limit,
+                              args.retry_after)
+    print(f"Fake OpenAI endpoint listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
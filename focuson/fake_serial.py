@@ -0,0 +1,83 @@
+"""
+Fake serial device backed by a pseudo-terminal, to exercise the
+serial output without the LED hardware (POSIX only).
+"""
+
+import os
+import select
+import tempfile
+import threading
+
+
+class FakeSerialDevice(object):
+    """
+    This class creates a pseudo-terminal that pyserial can open like a
+    real device, and records the lines written to it.
+    The device is reached through a symlink, so that it can be unplugged
+    and plugged back under the same port name.
+    """
+
+    def __init__(self):
+        self._directory = tempfile.mkdtemp(prefix="focuson_serial_")
+        self.port = os.path.join(self._directory, "tty")
+        self.lines = []
+
+        self._master = None
+        self._slave = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._unplugged = threading.Event()
+
+    def plug(self):
+        """Creates a new pseudo-terminal behind the port and returns the device"""
+        self._master, self._slave = os.openpty()
+        if os.path.lexists(self.port):
+            os.remove(self.port)
+        os.symlink(os.ttyname(self._slave), self.port)
+
+        self._unplugged.clear()
+        self._thread = threading.Thread(target=self._read, args=(self._master,), name="FakeSerialDevice", daemon=True)
+        self._thread.start()
+        return self
+
+    def _read(self, master):
+        """Records the lines written to the device until it is unplugged"""
+        pending = b""
+        while not self._unplugged.is_set():
+            if not select.select([master], [], [], 0.05)[0]:
+                continue
+            try:
+                data = os.read(master, 1024)
+            except OSError:
+                return
+            if not data:
+                return
+
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            with self._lock:
+                self.lines.extend(line.decode() for line in lines)
+
+    def received(self):
+        """Returns a copy of the lines received so far"""
+        with self._lock:
+            return list(self.lines)
+
+    def unplug(self):
+        """Closes the pseudo-terminal, writes to the port then fail"""
+        self._unplugged.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+        if os.path.lexists(self.port):
+            os.remove(self.port)
+
+    def close(self):
+        """Unplugs the device and removes its files"""
+        self.unplug()
+        os.rmdir(self._directory)
@@ -0,0 +1,231 @@
+import itertools
+import numpy as np
+
+# Default rules
+PARAMETERS = {
+    'blink_threshold': 40,  # Change of the blink rate from the baseline, in percent
+    'blink_penalty': 5,
+    'eye_contact_threshold': 5,  # Time looking away, in seconds
+    'eye_contact_penalty': 3,
+    'productivity_penalty': 8,
+    'recovery_rate': 0.1,  # Points per second while no penalty is active
+}
+
+# Gaze ratios beyond which the user looks away from the screen
+LOOKING_RIGHT_RATIO = 0.45
+LOOKING_LEFT_RATIO = 0.70
+
+
+class FocusScore(object):
+    """
+    This class holds the focus score of a session. Penalties are applied
+    once per event: when the blink rate moves away from the baseline, when
+    the user looks away for too long, and when a non-productive activity is
+    detected. While none of them is active, the score slowly recovers.
+    """
+
+    def __init__(self, start_time, score=100, **parameters):
+        """
+        Arguments:
+            start_time (float): Timestamp of the beginning of the session
+            score (float): Initial score, between 0 and 100
+            parameters: Values replacing the defaults of PARAMETERS
+        """
+        unknown = set(parameters) - set(PARAMETERS)
+        if unknown:
+            raise TypeError(f"Unknown focus score parameters: {', '.join(sorted(unknown))}")
+        for name, value in PARAMETERS.items():
+            setattr(self, name, parameters.get(name, value))
+
+        self.score = score
+        self.last_update = start_time
+
+        # Distraction event tracking (to prevent repeated penalties)
+        self.blink_penalty_applied = False
+        self.eye_contact_penalty_applied = False
+        self.productivity_penalty_applied = False
+
+    def update(self, current_time, blink_change, time_looking_away, non_productive):
+        """Applies the rules to a frame and returns the new score
+
+        Arguments:
+            current_time (float): Timestamp of the frame
+            blink_change (float): Change of the blink rate from the baseline in percent,
+                None before the baseline is established or without any recent blink
+            time_looking_away (float): Time since the user looks away, None if looking at the screen
+            non_productive (bool): True while a non-productive activity is reported
+        """
+        # Check for blink rate changes and apply penalty only once
+        if blink_change is not None:
+            if blink_change >= self.blink_threshold and not self.blink_penalty_applied:
+                self.score -= self.blink_penalty
+                self.blink_penalty_applied = True
+            elif blink_change < self.blink_threshold:
+                self.blink_penalty_applied = False  # Reset flag when condition improves
+
+        # Check for eye contact issues and apply penalty only once
+        if time_looking_away is not None:
+            if time_looking_away >= self.eye_contact_threshold and not self.eye_contact_penalty_applied:
+                self.score -= self.eye_contact_penalty
+                self.eye_contact_penalty_applied = True
+            elif time_looking_away < self.eye_contact_threshold:
+                self.eye_contact_penalty_applied = False  # Reset flag when looking back
+
+        # Check for productivity issues and apply penalty only once
+        if non_productive and not self.productivity_penalty_applied:
+            self.score -= self.productivity_penalty
+            self.productivity_penalty_applied = True
+        elif not non_productive:
+            self.productivity_penalty_applied = False  # Reset flag when productivity improves
+
+        # Gradual score recovery over time (when no penalties are active)
+        if blink_change is not None and blink_change < self.blink_threshold and \
+           (time_looking_away is None or time_looking_away < self.eye_contact_threshold) and \
+           not non_productive:
+            self.score += self.recovery_rate * (current_time - self.last_update)
+
+        # Clamp score between 0 and 100
+        self.score = max(0, min(100, self.score))
+        self.last_update = current_time
+        return self.score
+
+
+def blink_change(bpm, baseline_bpm):
+    """Returns the change of the blink rate from the baseline in percent,
+    None if there is no baseline yet or no recent blink
+
+    Arguments:
+        bpm (float): Blinks per minute
+        baseline_bpm (float): Blinks per minute of the baseline, None if not established
+    """
+    if baseline_bpm is None or bpm <= 0:
+        return None
+    if baseline_bpm == 0:
+        return float("inf")
+    return abs(bpm - baseline_bpm) / baseline_bpm * 100
+
+
+def _events(condition, valid):
+    """Returns the frames at which a once-per-event penalty is applied:
+    the condition becomes true, and stays so until it is false on a
+    valid frame. Invalid frames leave the state unchanged.
+
+    Arguments:
+        condition (numpy.ndarray): Condition of each frame, of shape (n, m)
+        valid (numpy.ndarray): Frames at which the condition is known, of shape (n,)
+    """
+    n = len(valid)
+    # Index of the last valid frame, forward filled
+    last_valid = np.maximum.accumulate(np.where(valid, np.arange(n), -1))
+    state = np.where((last_valid >= 0)[:, None], condition[np.maximum(last_valid, 0)], False)
+    previous = np.vstack((np.zeros((1, state.shape[1]), bool), state[:-1]))
+    return state & ~previous
+
+
+def simulate(times, blink_changes, time_looking_away, non_productive, score=100, **parameters):
+    """Applies the focus score rules to recorded time series, for every
+    combination of parameters at once. Returns the scores of shape (n, m),
+    one column per combination, equal to those of FocusScore.update.
+
+    Arguments:
+        times (numpy.ndarray): Timestamps of the n frames
+        blink_changes (numpy.ndarray): Change of the blink rate from the baseline in percent, NaN when unknown
+        time_looking_away (numpy.ndarray): Time since the user looks away, NaN when looking at the screen
+        non_productive (numpy.ndarray): True while a non-productive activity is reported
+        score (float): Initial score
+        parameters: Arrays of the m values of each parameter, or single values, defaults of PARAMETERS
+    """
+    unknown = set(parameters) - set(PARAMETERS)
+    if unknown:
+        raise TypeError(f"Unknown focus score parameters: {', '.join(sorted(unknown))}")
+    values = np.broadcast_arrays(*[np.atleast_1d(np.asarray(parameters.get(name, default), float))
+                                   for name, default in PARAMETERS.items()])
+    p = dict(zip(PARAMETERS, values))
+
+    times = np.asarray(times, float)
+    blink_changes = np.asarray(blink_changes, float)[:, None]
+    time_looking_away = np.asarray(time_looking_away, float)[:, None]
+    non_productive = np.asarray(non_productive, bool)[:, None]
+    blink_known = ~np.isnan(blink_changes[:, 0])
+    looking_away = ~np.isnan(time_looking_away[:, 0])
+
+    # NaN comparisons are false: unknown frames are neither above nor below the thresholds
+    blink_high = blink_changes >= p['blink_threshold']
+    away_long = time_looking_away >= p['eye_contact_threshold']
+    penalties = (
+        _events(blink_high, blink_known) * p['blink_penalty']
+        + _events(away_long, looking_away) * p['eye_contact_penalty']
+        + _events(np.broadcast_to(non_productive, blink_high.shape), np.ones(len(times), bool)) * p['productivity_penalty']
+    )
+
+    recovering = (blink_changes < p['blink_threshold']) & ~away_long & ~non_productive
+    elapsed = np.diff(times, prepend=times[:1])[:, None]
+    deltas = np.where(recovering, p['recovery_rate'] * elapsed, 0.0) - penalties
+
+    # The clamping to [0, 100] makes the sum path dependent: the frames are
+    # walked in order, each step updating all the combinations at once
+    scores = np.empty(deltas.shape)
+    current = np.full(deltas.shape[1], float(score))
+    for i, delta in enumerate(deltas):
+        current += delta
+        np.clip(current, 0, 100, out=current)
+        scores[i] = current
+    return scores
+
+
+def series_from_recording(records, baseline_duration=30):
+    """Returns the time series of a recording (see recorder.load_recording)
+    as inputs of simulate(): times, blink changes, times looking away and
+    non-productive frames. The baseline is the blink rate after
+    baseline_duration seconds, and a non-productive activity is reported
+    while the session showed its message, as recorded.
+
+    Arguments:
+        records (numpy.ndarray): Records of a recording
+        baseline_duration (float): Time to establish the baseline, in seconds
+    """
+    times = records['timestamp'].astype(float)
+    bpm = records['bpm'].astype(float)
+
+    # Blink changes, from the first frame at which the baseline is established
+    established = times - times[0] >= baseline_duration
+    changes = np.full(len(times), np.nan)
+    if established.any():
+        first = int(np.argmax(established))
+        baseline = bpm[first]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.abs(bpm - baseline) / baseline * 100
+        changes[first:] = np.where(bpm[first:] > 0, change[first:], np.nan)
+
+    # Time since the beginning of each run of frames looking away
+    horizontal_ratio = records['horizontal_ratio'].astype(float)
+    away = (horizontal_ratio <= LOOKING_RIGHT_RATIO) | (horizontal_ratio >= LOOKING_LEFT_RATIO)
+    run_start = away & ~np.concatenate(([False], away[:-1]))
+    start_times = np.maximum.accumulate(np.where(run_start, times, -np.inf))
+    time_looking_away = np.where(away, times - start_times, np.nan)
+
+    return times, changes, time_looking_away, records['non_productive_reported'].astype(bool)
+
+
+def parameter_grid(**values):
+    """Returns every combination of the given parameter values, as one array per parameter"""
+    names = list(values)
+    combinations = np.array(list(itertools.product(*[np.atleast_1d(values[name]) for name in names])), float)
+    return {name: combinations[:, i] for i, name in enumerate(names)}
+
+
+def mean_scores(series, grid, chunk=256):
+    """Returns the mean score of a recording for every combination of
+    parameters, simulated chunk by chunk to bound the memory used
+
+    Arguments:
+        series (tuple): Inputs of simulate(), see series_from_recording
+        grid (dict): Arrays of the values of each parameter, see parameter_grid
+        chunk (int): Number of combinations simulated at once
+    """
+    count = len(next(iter(grid.values()))) if grid else 1
+    means = np.empty(count)
+    for start in range(0, count, chunk):
+        parameters = {name: values[start:start + chunk] for name, values in grid.items()}
+        means[start:start + chunk] = simulate(*series, **parameters).mean(axis=0)
+    return means
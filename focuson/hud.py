@@ -0,0 +1,104 @@
+import numpy as np
+import cv2
+
+
+class Hud(object):
+    """
+    This class draws the text labels of the video feed, each one on a
+    semi-transparent background. Labels are queued with add() and drawn
+    with render(): all backgrounds are drawn into one mask and blended
+    in a single pass, on their pixels only, instead of blending the
+    whole frame for every label.
+    """
+
+    def __init__(self, font=cv2.FONT_HERSHEY_DUPLEX, padding=10, bg_alpha=0.3):
+        """
+        Arguments:
+            font (int): OpenCV font of the labels
+            padding (int): Space between the text and the edge of its background, in pixels
+            bg_alpha (float): Opacity of the backgrounds
+        """
+        self.font = font
+        self.padding = padding
+        self.bg_alpha = bg_alpha
+        self._labels = []
+        self._text_sizes = {}
+        self._max_text_sizes = 256
+
+    def text_size(self, text, font_scale, thickness, static=False):
+        """Returns the size and baseline of a text, like cv2.getTextSize.
+        The sizes of static texts are cached.
+
+        Arguments:
+            text (str): Text to measure
+            font_scale (float): Scale of the font
+            thickness (int): Thickness of the strokes
+            static (bool): True if the text does not change from frame to frame
+        """
+        if not static:
+            return cv2.getTextSize(text, self.font, font_scale, thickness)
+
+        key = (text, font_scale, thickness)
+        size = self._text_sizes.get(key)
+        if size is None:
+            if len(self._text_sizes) >= self._max_text_sizes:
+                self._text_sizes.clear()
+            size = self._text_sizes[key] = cv2.getTextSize(text, self.font, font_scale, thickness)
+        return size
+
+    def add(self, text, position, font_scale, color, thickness, bg_color=(0, 0, 0), static=False):
+        """Queues a label, drawn on the next call to render()
+
+        Arguments:
+            text (str): Text of the label
+            position (tuple): Bottom-left corner of the text (x, y)
+            font_scale (float): Scale of the font
+            color (tuple): BGR color of the text
+            thickness (int): Thickness of the strokes
+            bg_color (tuple): BGR color of the background
+            static (bool): True if the text does not change from frame to frame
+        """
+        (text_width, text_height), _ = self.text_size(text, font_scale, thickness, static)
+        x, y = position
+        rect = (x - self.padding, y - text_height - self.padding, x + text_width + self.padding, y + self.padding)
+        self._labels.append((text, position, font_scale, color, thickness, bg_color, rect))
+
+    def render(self, frame):
+        """Draws the queued labels on the frame, in place
+
+        Argument:
+            frame (numpy.ndarray): BGR frame
+        """
+        labels, self._labels = self._labels, []
+        if not labels:
+            return frame
+
+        height, width = frame.shape[:2]
+        rects = []
+        for label in labels:
+            x1, y1, x2, y2 = label[6]
+            rects.append((max(x1, 0), max(y1, 0), min(x2 + 1, width), min(y2 + 1, height)))
+
+        # Blending is limited to the box around all the backgrounds
+        left = min(rect[0] for rect in rects)
+        top = min(rect[1] for rect in rects)
+        right = max(rect[2] for rect in rects)
+        bottom = max(rect[3] for rect in rects)
+
+        if right > left and bottom > top:
+            region = frame[top:bottom, left:right]
+            overlay = region.copy()
+            mask = np.zeros(region.shape[:2], np.uint8)
+            for label, (x1, y1, x2, y2) in zip(labels, rects):
+                if x2 > x1 and y2 > y1:
+                    corners = ((x1 - left, y1 - top), (x2 - left - 1, y2 - top - 1))
+                    cv2.rectangle(overlay, *corners, label[5], -1)
+                    cv2.rectangle(mask, *corners, 255, -1)
+
+            blended = cv2.addWeighted(overlay, self.bg_alpha, region, 1 - self.bg_alpha, 0)
+            cv2.copyTo(blended, mask, region)
+
+        for text, position, font_scale, color, thickness, _, _ in labels:
+            cv2.putText(frame, text, position, self.font, font_scale, color, thickness)
+
+        return frame
@@ -0,0 +1,204 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram(object):
+    """
+    This class counts observations in fixed buckets, like a Prometheus
+    histogram. Observing a value is a binary search and an increment.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def copy(self):
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.count = self.count
+        histogram.sum = self.sum
+        return histogram
+
+    def since(self, previous):
+        """Returns the histogram of the observations made after a copy of this one
+
+        Argument:
+            previous (Histogram): Earlier copy, None for all the observations
+        """
+        if previous is None:
+            return self.copy()
+        histogram = Histogram(self.buckets)
+        histogram.counts = [count - before for count, before in zip(self.counts, previous.counts)]
+        histogram.count = self.count - previous.count
+        histogram.sum = self.sum - previous.sum
+        return histogram
+
+    def quantile(self, q):
+        """Returns the upper bound of the bucket holding the given quantile"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics(object):
+    """
+    This class records the runtime metrics of the FocusON hot path:
+    a latency histogram per stage (capture wait, detection, landmarks, pupils,
+    HUD, serial writes, productivity analysis...), the frame rate, counters
+    and gauges. They are exported periodically as a JSON line appended to
+    a file, with the latencies of the last interval, and as a Prometheus
+    text file, with the cumulative histograms.
+    """
+
+    def __init__(self, jsonl_path=None, prometheus_path=None, interval=10.0):
+        """
+        Arguments:
+            jsonl_path (str): File to which a JSON line is appended at every export
+            prometheus_path (str): File rewritten at every export in the Prometheus text format
+            interval (float): Time between two exports, in seconds
+        """
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.interval = interval
+        self.histograms = {}  # Cumulative, since the start of the process
+        self.counters = {}
+        self.gauges = {}
+        self.fps = 0.0
+
+        self._lock = threading.Lock()
+        self._frames = 0
+        self._last_export = time.monotonic()
+        self._exported = {}  # Copies of the histograms at the last export
+
+    def observe(self, stage, seconds):
+        """Records the latency of a stage
+
+        Arguments:
+            stage (str): Name of the stage
+            seconds (float): Duration of the stage
+        """
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """Records the duration of the enclosed block as the latency of a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def increment(self, name, value=1):
+        """Adds a value to a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        """Sets the value of a gauge"""
+        self.gauges[name] = value
+
+    def frame(self):
+        """Counts a processed frame and exports the metrics when the interval has elapsed"""
+        self._frames += 1
+        now = time.monotonic()
+        if now - self._last_export >= self.interval:
+            self.export(now)
+
+    def snapshot(self):
+        """Returns the current metrics as a dictionary, the latencies of
+        the stages being those observed since the last export"""
+        with self._lock:
+            stages = {}
+            for stage, histogram in self.histograms.items():
+                histogram = histogram.since(self._exported.get(stage))
+                stages[stage] = {
+                    'count': histogram.count,
+                    'mean_ms': histogram.sum / histogram.count * 1000 if histogram.count else None,
+                    'p50_ms': _milliseconds(histogram.quantile(0.50)),
+                    'p95_ms': _milliseconds(histogram.quantile(0.95)),
+                    'p99_ms': _milliseconds(histogram.quantile(0.99)),
+                }
+            return {
+                'time': time.time(),
+                'fps': self.fps,
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'stages': stages,
+            }
+
+    def prometheus(self):
+        """Returns the current metrics in the Prometheus text format"""
+        lines = [
+            "# HELP focuson_stage_latency_seconds Latency of the FocusON pipeline stages",
+            "# TYPE focuson_stage_latency_seconds histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'focuson_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'focuson_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'focuson_stage_latency_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'focuson_stage_latency_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            lines += ["# TYPE focuson_fps gauge", f"focuson_fps {self.fps}"]
+            for name, value in sorted(self.counters.items()):
+                lines += [f"# TYPE focuson_{name}_total counter", f"focuson_{name}_total {value}"]
+            for name, value in sorted(self.gauges.items()):
+                lines += [f"# TYPE focuson_{name} gauge", f"focuson_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self, now=None):
+        """Updates the frame rate and writes the metrics files"""
+        if now is None:
+            now = time.monotonic()
+        elapsed = now - self._last_export
+        if elapsed > 0:
+            self.fps = self._frames / elapsed
+        self._frames = 0
+        self._last_export = now
+
+        if self.jsonl_path:
+            with open(self.jsonl_path, "a") as f:
+                f.write(json.dumps(self.snapshot()) + "\n")
+        with self._lock:
+            self._exported = {stage: histogram.copy() for stage, histogram in self.histograms.items()}
+
+        if self.prometheus_path:
+            # Written aside then renamed, so that a scraper never reads a partial file
+            temp_path = self.prometheus_path + ".tmp"
+            with open(temp_path, "w") as f:
+                f.write(self.prometheus())
+            os.replace(temp_path, self.prometheus_path)
+
+
+def _milliseconds(seconds):
+    """Converts a bucket bound to milliseconds, None if it is unknown or unbounded"""
+    if seconds is None or seconds == float("inf"):
+        return None
+    return seconds * 1000
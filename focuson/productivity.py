@@ -0,0 +1,370 @@
+import os
+import io
+import base64
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from .api_client import shared_client
+from .screenshot_cache import dhash
+
+openai_api_key = os.getenv('OPENAI_API_KEY')  # Get API key from environment variable DO NOT SHARE THIS KEY WITH ANYONE
+
+# Qualities tried in turn until a lossy screenshot fits in the byte budget
+BUDGET_QUALITIES = (85, 70, 55, 40, 25)
+
+def grab_screenshot(resample=Image.LANCZOS):
+    """Take a screenshot, resize to 720p, and return the image
+
+    Argument:
+        resample (int): PIL resampling filter, Image.BILINEAR is much faster than Image.LANCZOS
+    """
+    try:
+        from PIL import ImageGrab  # Imported on first use, it loads the platform screen capture backend
+        screenshot = ImageGrab.grab()
+        
+        # Resize to 720p (1280x720) while maintaining aspect ratio (Saves tokens on API calls)
+        target_width = 1280
+        target_height = 720
+        
+        # Calculate new dimensions maintaining aspect ratio
+        original_width, original_height = screenshot.size
+        aspect_ratio = original_width / original_height
+        target_aspect_ratio = target_width / target_height
+        
+        if aspect_ratio > target_aspect_ratio:
+            # Image is wider than target, fit to width
+            new_width = target_width
+            new_height = int(target_width / aspect_ratio)
+        else:
+            # Image is taller than target, fit to height
+            new_height = target_height
+            new_width = int(target_height * aspect_ratio)
+        
+        # Resize the image
+        return screenshot.resize((new_width, new_height), resample)
+    except Exception as e:
+        print(f"Error taking screenshot: {e}")
+        return None
+
+def encode_screenshot(resized_screenshot, image_format="PNG", quality=85, max_bytes=None):
+    """Return the screenshot as base64 string, encoded in memory
+
+    Arguments:
+        resized_screenshot (PIL.Image.Image): Screenshot to encode
+        image_format (str): "PNG", "JPEG" or "WEBP"
+        quality (int): Quality of the lossy formats
+        max_bytes (int): Byte budget of a lossy screenshot once base64 encoded, as sent in the
+            request, the quality is lowered until it fits
+    """
+    try:
+        image_format = image_format.upper()
+        image = resized_screenshot
+        if image_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+
+        if image_format == "PNG" or max_bytes is None:
+            qualities = [quality]
+        else:
+            qualities = [quality] + [q for q in BUDGET_QUALITIES if q < quality]
+
+        for q in qualities:
+            buffer = io.BytesIO()
+            if image_format == "PNG":
+                image.save(buffer, format="PNG", optimize=True)
+            else:
+                image.save(buffer, format=image_format, quality=q)
+            # Base64 encodes every 3 bytes, or fewer at the end, as 4 characters
+            if max_bytes is None or 4 * -(-buffer.tell() // 3) <= max_bytes:
+                break
+
+        return base64.b64encode(buffer.getbuffer()).decode('utf-8')
+    except Exception as e:
+        print(f"Error encoding screenshot: {e}")
+        return None
+
+def image_mime_type(image_base64):
+    """Return the MIME type of a base64 encoded screenshot"""
+    header = base64.b64decode(image_base64[:16])
+    if header.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/png"
+
+def take_screenshot():
+    """Take a screenshot, resize to 720p, and return the image as base64 string"""
+    screenshot = grab_screenshot()
+    if screenshot is None:
+        return None
+    return encode_screenshot(screenshot)
+
+PROMPT = "Analyze this screenshot and determine if the user is on a productive website/application or a non-productive one. Consider:\n- Work-related websites (email, documents, coding, etc.)\n- Educational content\n- Social media, entertainment, gaming, shopping\n\nRespond with only 'PRODUCTIVE' if the content is work/education related, or 'NON-PRODUCTIVE' if it's entertainment/social media. If you can't determine, respond with 'UNKNOWN'."
+
+BATCH_PROMPT = "Analyze each of these {count} screenshots and determine if the user is on a productive website/application or a non-productive one. Consider:\n- Work-related websites (email, documents, coding, etc.)\n- Educational content\n- Social media, entertainment, gaming, shopping\n\nRespond with exactly {count} lines, one per screenshot in order, each with only 'PRODUCTIVE' if the content is work/education related, or 'NON-PRODUCTIVE' if it's entertainment/social media. If you can't determine, write 'UNKNOWN'."
+
+def _image_part(image_base64):
+    """Returns a screenshot as a part of a chat message"""
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:{image_mime_type(image_base64)};base64,{image_base64}"
+        }
+    }
+
+def analyze_productivity_with_chatgpt(image_base64, timeout=None, client=None):
+    """Send screenshot to ChatGPT for productivity analysis
+
+    Arguments:
+        image_base64 (str): Screenshot, base64 encoded
+        timeout (float): Time after which the analysis is abandoned, retries included, in seconds
+        client (api_client.ApiClient): Client of the API, the one shared by the process by default
+    """
+    if client is None:
+        if not openai_api_key:
+            return "Error: OpenAI API key not found. Please set OPENAI_API_KEY environment variable."
+        client = shared_client()
+
+    try:
+        content = [{"type": "text", "text": PROMPT}, _image_part(image_base64)]
+        return client.complete(content, max_tokens=50, timeout=timeout)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+def analyze_screenshots(images_base64, timeout=None, client=None):
+    """Send several screenshots to ChatGPT in a single request, and return one analysis result per screenshot
+
+    Arguments:
+        images_base64 (list): Screenshots, base64 encoded
+        timeout (float): Time after which the analysis is abandoned, retries included, in seconds
+        client (api_client.ApiClient): Client of the API, the one shared by the process by default
+    """
+    if len(images_base64) == 1:
+        return [analyze_productivity_with_chatgpt(images_base64[0], timeout, client)]
+    if client is None:
+        if not openai_api_key:
+            return ["Error: OpenAI API key not found. Please set OPENAI_API_KEY environment variable."] * len(images_base64)
+        client = shared_client()
+
+    try:
+        content = [{"type": "text", "text": BATCH_PROMPT.format(count=len(images_base64))}]
+        content += [_image_part(image_base64) for image_base64 in images_base64]
+        text = client.complete(content, max_tokens=20 * len(images_base64), timeout=timeout)
+    except Exception as e:
+        return [f"Error: {str(e)}"] * len(images_base64)
+
+    verdicts = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(verdicts) != len(images_base64):
+        return [f"Error: {len(verdicts)} verdicts for {len(images_base64)} screenshots"] * len(images_base64)
+    return verdicts
+
+
+class _BatchedScreenshot(object):
+    """A screenshot waiting in a batch, with its result once analyzed"""
+
+    __slots__ = ("image", "result", "leader")
+
+    def __init__(self, image):
+        self.image = image
+        self.result = None
+        self.leader = False
+
+
+class BatchingClassifier(object):
+    """
+    This class stands for the productivity classifier of the
+    ProductivityWorker, and sends the screenshots submitted within a short
+    time of each other in a single request. The first screenshot of a
+    batch waits for the others, up to max_wait, then its thread sends at
+    most batch_size screenshots and hands the results to the other
+    threads. The first screenshot left over leads the next batch.
+    """
+
+    def __init__(self, analyze=analyze_screenshots, batch_size=4, max_wait=0.5):
+        """
+        Arguments:
+            analyze (callable): Takes base64 screenshots and a timeout, returns one result per screenshot
+            batch_size (int): Maximum number of screenshots per request, sent without waiting once reached
+            max_wait (float): Maximum time the first screenshot of a batch waits for others, in seconds
+        """
+        self.analyze = analyze
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+
+        self._batch = []
+        self._condition = threading.Condition()
+
+    def __call__(self, image_base64, timeout=None):
+        screenshot = _BatchedScreenshot(image_base64)
+        with self._condition:
+            self._batch.append(screenshot)
+            screenshot.leader = len(self._batch) == 1
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: screenshot.leader or screenshot.result is not None)
+            if screenshot.result is not None:
+                return screenshot.result
+
+            # Leader of the batch: waits for it to fill, then takes at most batch_size screenshots
+            self._condition.wait_for(lambda: len(self._batch) >= self.batch_size, self.max_wait)
+            batch, self._batch = self._batch[:self.batch_size], self._batch[self.batch_size:]
+            if self._batch:
+                self._batch[0].leader = True
+                self._condition.notify_all()
+            self.batches += 1
+
+        try:
+            results = self.analyze([waiting.image for waiting in batch], timeout=timeout)
+            if len(results) != len(batch):
+                results = [f"Error: {len(results)} results for {len(batch)} screenshots"] * len(batch)
+        except Exception as e:
+            results = [f"Error: {str(e)}"] * len(batch)
+
+        with self._condition:
+            for waiting, result in zip(batch, results):
+                waiting.result = result
+            self._condition.notify_all()
+        return screenshot.result
+
+
+class ProductivityWorker(object):
+    """
+    This class takes screenshots and classifies them on background threads,
+    so that the frame loop keeps running while a request is pending.
+    Results are posted back to the loop through poll().
+    """
+
+    def __init__(self, screenshot=grab_screenshot, encoder=encode_screenshot,
+                 classifier=analyze_productivity_with_chatgpt, max_in_flight=1, timeout=20.0, cache=None,
+                 metrics=None, chain=None):
+        """
+        Arguments:
+            screenshot (callable): Returns a PIL screenshot, or None on failure
+            encoder (callable): Takes a PIL screenshot, returns it as base64 string
+            classifier (callable): Takes a base64 screenshot and a timeout, returns the analysis result
+            max_in_flight (int): Maximum number of requests running at the same time
+            timeout (float): Time after which a pending request is abandoned, in seconds
+            cache (screenshot_cache.ScreenshotCache): Reuses the verdict of near-identical screens
+            metrics (metrics.Metrics): Records the latency of the screenshots and of the classification
+            chain (classifier.ClassifierChain): Local tiers tried before the classifier, which is only
+                called when none of them decides
+        """
+        self.screenshot = screenshot
+        self.encoder = encoder
+        self.classifier = classifier
+        self.cache = cache
+        self.metrics = metrics
+        self.chain = chain
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="ProductivityWorker")
+        self._pending = []
+        self._abandoned = []
+        self._last_submitted = 0
+
+    def _analyze(self):
+        """Takes a screenshot and classifies it (runs on a worker thread)"""
+        captured = []
+
+        def grab():
+            # Taken once, and only if a tier needs it
+            if not captured:
+                start = time.perf_counter()
+                captured.append(self.screenshot())
+                if self.metrics is not None:
+                    self.metrics.observe("screenshot", time.perf_counter() - start)
+            return captured[0]
+
+        if self.chain is not None:
+            verdict = self.chain.classify(grab)
+            if verdict is not None:
+                return verdict
+
+        screenshot = grab()
+        if screenshot is None:
+            return None
+
+        if self.cache is not None:
+            image_hash = dhash(screenshot)
+            verdict = self.cache.get(image_hash)
+            if verdict is not None:
+                return verdict
+
+        screenshot_base64 = self.encoder(screenshot)
+        if not screenshot_base64:
+            return None
+
+        start = time.perf_counter()
+        result = self.classifier(screenshot_base64, timeout=self.timeout)
+        if self.metrics is not None:
+            self.metrics.observe("productivity", time.perf_counter() - start)
+
+        # Only definite verdicts are worth reusing, errors are retried
+        if self.cache is not None and result.strip().upper() in ("PRODUCTIVE", "NON-PRODUCTIVE"):
+            self.cache.put(image_hash, result)
+        return result
+
+    @property
+    def in_flight(self):
+        """Number of requests still running, including abandoned ones"""
+        self._abandoned = [future for future in self._abandoned if not future.done()]
+        return len(self._pending) + len(self._abandoned)
+
+    def submit(self):
+        """Starts a new analysis in the background. Returns False if
+        the cap on in-flight requests is reached.
+        """
+        if self.in_flight >= self.max_in_flight:
+            return False
+
+        self._last_submitted += 1
+        future = self._executor.submit(self._analyze)
+        self._pending.append((self._last_submitted, time.monotonic(), future))
+        return True
+
+    def poll(self):
+        """Returns the result of the most recent finished request, or
+        None if there is nothing new. Requests older than that result
+        are stale: they are cancelled, or abandoned if already running.
+        Requests running for longer than the timeout are abandoned and
+        reported as an error.
+        """
+        now = time.monotonic()
+        result = None
+        newest = None
+
+        for request_id, started, future in self._pending:
+            if future.done():
+                if not future.cancelled():
+                    newest = request_id
+                    error = future.exception()
+                    result = f"Error: {error}" if error is not None else future.result()
+            elif now - started > self.timeout:
+                newest = request_id
+                result = "Error: Productivity analysis timed out"
+                future.cancel()
+                self._abandoned.append(future)
+
+        if newest is None:
+            return None
+
+        still_pending = []
+        for request_id, started, future in self._pending:
+            if future.done() or future in self._abandoned:
+                continue
+            if request_id < newest:
+                if not future.cancel():
+                    self._abandoned.append(future)
+            else:
+                still_pending.append((request_id, started, future))
+        self._pending = still_pending
+
+        return result
+
+    def shutdown(self):
+        """Cancels the pending requests without waiting for the running ones"""
+        for _, _, future in self._pending:
+            future.cancel()
+        self._pending = []
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,177 @@
+import os
+import time
+import numpy as np
+
+# Fixed-width little-endian record, one per sample
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('bpm', '<f4'),
+    ('horizontal_ratio', '<f4'),
+    ('vertical_ratio', '<f4'),
+    ('focus_score', '<f4'),
+    ('productivity', 'i1'),
+    ('non_productive_reported', 'u1'),  # 1 while the non-productive message is shown (focus score penalty)
+])
+
+# Values of the productivity field
+PRODUCTIVITY_UNKNOWN = -1
+NON_PRODUCTIVE = 0
+PRODUCTIVE = 1
+
+MAGIC = b"FOCUSREC"
+VERSION = 2
+HEADER_SIZE = 64
+
+
+def _header():
+    """Returns the header written at the beginning of every chunk"""
+    header = MAGIC + bytes([VERSION, RECORD_DTYPE.itemsize])
+    return header.ljust(HEADER_SIZE, b"\0")
+
+
+class SessionRecorder(object):
+    """
+    This class streams the samples of a session to disk as fixed-width
+    binary records, so that multi-hour sessions use constant memory.
+    Records are buffered in a preallocated array, flushed periodically,
+    and written to chunk files that are rotated when they reach a size
+    limit. A crash loses at most the samples of the last flush interval,
+    and chunks can be loaded back as memory-mapped NumPy arrays.
+    """
+
+    def __init__(self, directory, sample_interval=1.0, flush_interval=5.0, max_chunk_bytes=16 * 1024 * 1024,
+                 buffer_size=256):
+        """
+        Arguments:
+            directory (str): Folder of the chunk files, created if needed
+            sample_interval (float): Minimum time between two records, in seconds
+            flush_interval (float): Maximum time a record stays in memory, in seconds
+            max_chunk_bytes (int): Size after which a new chunk file is started
+            buffer_size (int): Number of records buffered between two writes
+        """
+        self.directory = directory
+        self.sample_interval = sample_interval
+        self.flush_interval = flush_interval
+        self.max_chunk_bytes = max_chunk_bytes
+        self.records = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._buffer = np.zeros(buffer_size, RECORD_DTYPE)
+        self._buffered = 0
+        self._last_sample = None
+        self._last_flush = time.monotonic()
+        self._chunk = len(chunk_paths(directory))
+        self._file = None
+        self._chunk_bytes = 0
+
+    def append(self, timestamp, bpm, horizontal_ratio, vertical_ratio, focus_score, productivity,
+               non_productive_reported=False):
+        """Records a sample, unless the previous one is more recent than
+        the sample interval. Returns true if the sample was recorded.
+
+        Arguments:
+            timestamp (float): Time of the sample
+            bpm (float): Blinks per minute
+            horizontal_ratio (float): Horizontal gaze ratio, None if the pupils are not located
+            vertical_ratio (float): Vertical gaze ratio, None if the pupils are not located
+            focus_score (float): Focus score, between 0 and 100
+            productivity (int): PRODUCTIVE, NON_PRODUCTIVE or PRODUCTIVITY_UNKNOWN
+            non_productive_reported (bool): True while a non-productive activity is reported,
+                the condition of the productivity penalty of the focus score
+        """
+        if self._last_sample is not None and timestamp - self._last_sample < self.sample_interval:
+            return False
+        self._last_sample = timestamp
+
+        self._buffer[self._buffered] = (
+            timestamp,
+            bpm,
+            np.nan if horizontal_ratio is None else horizontal_ratio,
+            np.nan if vertical_ratio is None else vertical_ratio,
+            focus_score,
+            productivity,
+            non_productive_reported,
+        )
+        self._buffered += 1
+        self.records += 1
+
+        if self._buffered == len(self._buffer) or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        return True
+
+    def _open_chunk(self):
+        """Starts a new chunk file"""
+        path = os.path.join(self.directory, f"chunk_{self._chunk:06d}.bin")
+        self._chunk += 1
+        self._file = open(path, "wb")
+        self._file.write(_header())
+        self._chunk_bytes = HEADER_SIZE
+
+    def flush(self):
+        """Writes the buffered records to the current chunk"""
+        self._last_flush = time.monotonic()
+        if self._buffered == 0:
+            return
+
+        if self._file is None or self._chunk_bytes >= self.max_chunk_bytes:
+            self._close_chunk()
+            self._open_chunk()
+
+        data = self._buffer[:self._buffered].tobytes()
+        self._file.write(data)
+        self._file.flush()
+        self._chunk_bytes += len(data)
+        self._buffered = 0
+
+    def _close_chunk(self):
+        """Closes the current chunk file"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """Flushes the buffered records and closes the current chunk"""
+        self.flush()
+        self._close_chunk()
+
+
+def chunk_paths(directory):
+    """Returns the chunk files of a recording, in order"""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if name.startswith("chunk_") and name.endswith(".bin"))
+    return [os.path.join(directory, name) for name in names]
+
+
+def open_chunk(path):
+    """Returns the records of a chunk file as a read-only memory-mapped
+    array, without copying them. A record left incomplete by a crash
+    is ignored.
+
+    Argument:
+        path (str): Chunk file
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if not header.startswith(MAGIC) or header[len(MAGIC)] != VERSION:
+        raise ValueError(f"{path} is not a FocusON recording chunk of version {VERSION}")
+
+    count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, RECORD_DTYPE)
+    return np.memmap(path, RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+def load_recording(directory):
+    """Returns all the records of a recording. With a single chunk the
+    array is memory-mapped, with several chunks they are concatenated.
+
+    Argument:
+        directory (str): Folder of the chunk files
+    """
+    chunks = [open_chunk(path) for path in chunk_paths(directory)]
+    if len(chunks) == 1:
+        return chunks[0]
+    if not chunks:
+        return np.zeros(0, RECORD_DTYPE)
+    return np.concatenate(chunks)
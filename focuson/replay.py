@@ -0,0 +1,154 @@
+"""
+Headless replay of a recorded video, or of a folder of frames, through
+the full FocusON pipeline: gaze tracking, blink, eye contact and focus
+score, with a stubbed productivity classifier. Frames are processed as
+fast as the CPU allows, timed by their position in the recording, and
+the usual session report is written at the end.
+
+Usage:
+    python -m focuson.replay recording.mp4 [--fps 30] [--verdict PRODUCTIVE] [--reports-dir reports]
+    python -m focuson.replay frames/ --fps 30 --verdict PRODUCTIVE --verdict NON-PRODUCTIVE
+"""
+
+import argparse
+import os
+import time
+import cv2
+from gaze_tracking import GazeTracking, AnalysisScheduler
+from .session import FocusSession
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def read_frames(source, fps=None):
+    """Yields the frames of a recording with their time from the
+    beginning of the recording, in seconds.
+
+    Arguments:
+        source (str): Video file, or folder of images sorted by name
+        fps (float): Frame rate of the recording, read from the video file by default
+    """
+    if os.path.isdir(source):
+        fps = fps or 30
+        names = sorted(name for name in os.listdir(source) if name.lower().endswith(IMAGE_EXTENSIONS))
+        for index, name in enumerate(names):
+            frame = cv2.imread(os.path.join(source, name))
+            if frame is not None:
+                yield index / fps, frame
+        return
+
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise IOError(f"Unable to open the recording {source}")
+    fps = fps or capture.get(cv2.CAP_PROP_FPS) or 30
+
+    try:
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield index / fps, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+class StubClassifier(object):
+    """
+    This class stands for the screenshot productivity analysis during a
+    replay: it returns verdicts from a fixed sequence, in turn.
+    """
+
+    def __init__(self, verdicts=("PRODUCTIVE",)):
+        """
+        Argument:
+            verdicts (iterable): Analysis results returned in turn
+        """
+        self.verdicts = list(verdicts)
+        self.calls = 0
+
+    def __call__(self):
+        verdict = self.verdicts[self.calls % len(self.verdicts)]
+        self.calls += 1
+        return verdict
+
+
+def replay(source, gaze=None, classifier=None, fps=None, start_time=None, reports_dir="reports", max_frames=None,
+           recorder=None, scheduler=None):
+    """Runs a recording through the FocusON pipeline and writes the
+    session report. Returns the session and the throughput statistics.
+
+    Arguments:
+        source (str): Video file, or folder of images sorted by name
+        gaze (gaze_tracking.GazeTracking): Gaze tracking to use, a new one by default
+        classifier (callable): Returns a productivity analysis result, StubClassifier() by default
+        fps (float): Frame rate of the recording, read from the video file by default
+        start_time (float): Timestamp given to the first frame, now by default
+        reports_dir (str): Folder in which the session report is written, None to skip it
+        max_frames (int): Stop after this number of frames
+        recorder (recorder.SessionRecorder): Streams the samples of the session to disk
+        scheduler (gaze_tracking.AnalysisScheduler): If set, decides which frames of the
+            gaze tracking are analyzed, timed by their position in the recording
+    """
+    if gaze is None:
+        gaze = GazeTracking()
+    if classifier is None:
+        classifier = StubClassifier()
+    if start_time is None:
+        start_time = time.time()
+
+    session = FocusSession(start_time, recorder)
+    frames = 0
+    current_time = start_time
+    started = time.perf_counter()
+
+    for timestamp, frame in read_frames(source, fps):
+        if max_frames is not None and frames >= max_frames:
+            break
+        current_time = start_time + timestamp
+
+        result = gaze.refresh(frame) if scheduler is None else scheduler.refresh(frame, current_time)
+        analysis_result = classifier() if session.screenshot_due(current_time) else None
+        session.update(result, current_time, analysis_result)
+        frames += 1
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        'frames': frames,
+        'recording_duration': current_time - start_time,
+        'processing_time': elapsed,
+        'fps': frames / elapsed if elapsed > 0 else 0,
+        'analyzed': frames if scheduler is None else scheduler.analyzed,
+    }
+
+    if reports_dir is not None:
+        session.generate_session_report(current_time, reports_dir)
+    return session, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Video file, or folder of images sorted by name")
+    parser.add_argument("--fps", type=float, help="Frame rate of the recording")
+    parser.add_argument("--verdict", action="append", help="Productivity result returned in turn (repeatable)")
+    parser.add_argument("--reports-dir", default="reports")
+    parser.add_argument("--max-frames", type=int)
+    parser.add_argument("--tracking", action="store_true", help="Track the face box between frames")
+    parser.add_argument("--detection-width", type=int, help="Width of the image given to the face detector")
+    parser.add_argument("--adaptive", action="store_true", help="Skip the analysis of static frames")
+    parser.add_argument("--pupil-mode", choices=("accurate", "fast"), default="accurate")
+    args = parser.parse_args()
+
+    gaze = GazeTracking(tracking=args.tracking, detection_width=args.detection_width, pupil_mode=args.pupil_mode)
+    scheduler = AnalysisScheduler(gaze, max_interval=0.5, target_fps=30) if args.adaptive else None
+    classifier = StubClassifier(args.verdict or ["PRODUCTIVE"])
+    _, stats = replay(args.source, gaze, classifier, args.fps, reports_dir=args.reports_dir, max_frames=args.max_frames,
+                      scheduler=scheduler)
+
+    print(f"Replayed {stats['frames']} frames ({stats['recording_duration']:.1f}s of recording) "
+          f"in {stats['processing_time']:.1f}s: {stats['fps']:.1f} frames per second, {stats['analyzed']} analyzed")
+
+
+if __name__ == "__main__":
+    main()
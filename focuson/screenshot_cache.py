@@ -0,0 +1,111 @@
+import collections
+import threading
+import time
+from PIL import Image
+
+
+def dhash(image, hash_size=8):
+    """Returns the difference hash of an image, as an integer of
+    hash_size * hash_size bits. Near-identical screens give hashes
+    that differ by only a few bits.
+
+    Arguments:
+        image (PIL.Image.Image): Screenshot
+        hash_size (int): Width and height of the hash grid
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = small.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(hash1, hash2):
+    """Returns the number of bits that differ between two hashes"""
+    return bin(hash1 ^ hash2).count("1")
+
+
+class ScreenshotCache(object):
+    """
+    This class remembers the productivity verdicts of recent screenshots,
+    keyed by their perceptual hash, so that a screen that has not changed
+    is not sent for analysis again.
+    Entries expire after a time to live and the least recently used one
+    is evicted when the cache is full.
+    """
+
+    def __init__(self, max_entries=64, max_distance=4, ttl=600.0):
+        """
+        Arguments:
+            max_entries (int): Maximum number of verdicts kept
+            max_distance (int): Maximum Hamming distance between two hashes
+                for the screens to be considered the same
+            ttl (float): Time after which a verdict is not reused, in seconds
+        """
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self):
+        """Share of lookups answered from the cache, between 0.0 and 1.0"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, image_hash):
+        """Returns the verdict of a cached screen close enough to the
+        given hash, or None.
+
+        Argument:
+            image_hash (int): Perceptual hash of the screenshot
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, stored) in self._entries.items() if now - stored > self.ttl]
+            for key in expired:
+                del self._entries[key]
+
+            best = None
+            for key in self._entries:
+                distance = hamming_distance(key, image_hash)
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, key)
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best[1])
+            return self._entries[best[1]][0]
+
+    def put(self, image_hash, verdict):
+        """Stores the verdict of a screenshot
+
+        Arguments:
+            image_hash (int): Perceptual hash of the screenshot
+            verdict (str): Result of the productivity analysis
+        """
+        with self._lock:
+            self._entries[image_hash] = (verdict, time.monotonic())
+            self._entries.move_to_end(image_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Returns the cache counters as a dictionary"""
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+        }
@@ -0,0 +1,157 @@
+import threading
+import time
+
+
+def score_to_color(score):
+    if score >= 70:
+        return "green"
+    elif score >= 30:
+        return "yellow"
+    else:
+        return "red"
+
+
+class SerialOutput(object):
+    """
+    This class sends the focus color to the serial device (LED indicator).
+    The port is opened once and written from a background thread, only
+    when the color changes or when the heartbeat is due, so that a slow
+    or unplugged device never stalls the frame loop.
+    The port is reopened automatically after an error.
+    """
+
+    def __init__(self, port, baudrate=9600, heartbeat=5.0, reconnect_delay=2.0, write_timeout=1.0, metrics=None):
+        """
+        Arguments:
+            port (str): Serial port of the device (e.g. "COM5" or "/dev/ttyACM1")
+            baudrate (int): Speed of the serial link
+            heartbeat (float): Time after which the current color is sent again, in seconds
+            reconnect_delay (float): Time waited before reopening the port after an error, in seconds
+            write_timeout (float): Maximum time a write can block, in seconds
+            metrics (metrics.Metrics): Records the latency of the writes
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.heartbeat = heartbeat
+        self.reconnect_delay = reconnect_delay
+        self.write_timeout = write_timeout
+        self.metrics = metrics
+        self.writes = 0
+        self.errors = 0
+        self._failing = False
+
+        self._serial_module = None
+        self._serial = None
+        self._color = None
+        self._sent_color = None
+        self._last_write = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the writer thread and returns the output"""
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="SerialOutput", daemon=True)
+            self._thread.start()
+        return self
+
+    def send_score(self, score):
+        """Shows the color matching a focus score. Never blocks.
+
+        Argument:
+            score (float): Focus score, between 0 and 100
+        """
+        self.send_color(score_to_color(score))
+
+    def send_color(self, color):
+        """Shows a color. Never blocks.
+
+        Argument:
+            color (str): "green", "yellow" or "red"
+        """
+        with self._condition:
+            if color != self._color:
+                self._color = color
+                self._condition.notify_all()
+
+    def _is_due(self):
+        """Returns true if the color changed or the heartbeat is due"""
+        if self._color is None:
+            return False
+        return self._color != self._sent_color or time.monotonic() - self._last_write >= self.heartbeat
+
+    def _run(self):
+        """Writes the color whenever it is due, until the output is closed"""
+        try:
+            import serial  # Imported on the writer thread, so that pyserial is not loaded at startup
+        except ImportError:
+            print(f"Serial output disabled on {self.port}: pyserial is not installed (pip install pyserial)")
+            with self._condition:
+                self._running = False
+            return
+        self._serial_module = serial
+
+        while True:
+            with self._condition:
+                # Until a color is written, there is no heartbeat: wait to be notified
+                if self._sent_color is None:
+                    timeout = None
+                else:
+                    timeout = max(self.heartbeat - (time.monotonic() - self._last_write), 0)
+                self._condition.wait_for(lambda: not self._running or self._is_due(), timeout)
+                if not self._running:
+                    return
+                if not self._is_due():
+                    continue
+                color = self._color
+
+            if not self._write(color):
+                with self._condition:
+                    self._condition.wait_for(lambda: not self._running, self.reconnect_delay)
+
+    def _write(self, color):
+        """Writes a color to the device, opening the port if needed.
+        Returns false if the device could not be written.
+        """
+        serial = self._serial_module
+        start = time.perf_counter()
+        try:
+            if self._serial is None:
+                self._serial = serial.Serial(self.port, self.baudrate, write_timeout=self.write_timeout)
+            self._serial.write((color + "\n").encode())
+        except (serial.SerialException, OSError) as e:
+            self.errors += 1
+            if not self._failing:
+                print(f"Serial output error on {self.port}, reconnecting: {e}")
+            self._failing = True
+            self._disconnect()
+            return False
+
+        if self.metrics is not None:
+            self.metrics.observe("serial_write", time.perf_counter() - start)
+        self._failing = False
+        self._sent_color = color
+        self._last_write = time.monotonic()
+        self.writes += 1
+        return True
+
+    def _disconnect(self):
+        """Closes the port, it is reopened on the next write"""
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except (self._serial_module.SerialException, OSError):
+                pass
+            self._serial = None
+
+    def close(self):
+        """Stops the writer thread and closes the port"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._disconnect()
@@ -0,0 +1,347 @@
+import os
+import json
+import sqlite3
+import time
+from datetime import datetime
+from .blink_rate import BlinkRate
+from .focus_score import FocusScore, blink_change
+from .session_index import SessionIndex
+from .recorder import PRODUCTIVE, NON_PRODUCTIVE, PRODUCTIVITY_UNKNOWN
+
+
+class FocusSession(object):
+    """
+    This class holds the state of a FocusON session: blink rate and its
+    baseline, eye contact, productivity messages, focus score and session
+    statistics. It is updated once per analyzed frame with the time of
+    that frame, so that it runs the same on a live webcam and on a
+    recorded video.
+    """
+
+    def __init__(self, start_time=None, recorder=None, blink_windows=(15, 60, 300), bpm_window=60,
+                 score_parameters=None):
+        """
+        Arguments:
+            start_time (float): Timestamp of the beginning of the session, now by default
+            recorder (recorder.SessionRecorder): Streams the samples of the session to disk
+            blink_windows (tuple): Sliding windows over which the blink rate is measured, in seconds
+            bpm_window (float): Window of the blink rate compared to the baseline, one of blink_windows
+            score_parameters (dict): Focus score rules replacing the defaults of focus_score.PARAMETERS
+        """
+        if start_time is None:
+            start_time = time.time()
+
+        # Session tracking variables
+        self.session_start_time = start_time
+        self.session_data = {
+            'start_time': start_time,
+            'blink_count': 0,
+            'productive_time': 0,
+            'distraction_count': 0,
+            'focus_score_total': 0,
+            'data_points': 0
+        }
+
+        # Persistent focus score tracking, starting with a perfect score
+        self.score = FocusScore(start_time, **(score_parameters or {}))
+
+        # Blink tracking variables
+        self.blink_rate = BlinkRate(blink_windows, start_time)  # Sliding-window blink rates
+        self.bpm_window = bpm_window
+        self.blink_count = 0  # Blinks in the BPM window
+        self.last_blink_time = start_time
+        self.is_blinking_state = False  # To track blink state changes
+        self.elapsed_time = 0  # Time covered by the BPM window
+        self.bpm = 0
+
+        # Baseline tracking variables
+        self.baseline_bpm = None
+        self.baseline_established = False
+        self.baseline_start_time = start_time
+        self.baseline_duration = 30  # 30 seconds to establish baseline
+        self.change_percentage = None  # Change of the BPM from the baseline, once established
+        self.change_message = ""
+        self.change_message_time = 0
+        self.change_message_duration = 3  # Show message for 3 seconds
+
+        # Eye contact tracking variables
+        self.eye_contact_start_time = start_time
+        self.looking_away_start_time = None
+        self.eye_contact_threshold = self.score.eye_contact_threshold
+        self.eye_contact_message = ""
+        self.eye_contact_message_time = 0
+        self.eye_contact_message_duration = 3  # Show message for 3 seconds
+
+        # Screenshot and productivity tracking variables
+        self.screenshot_interval = 30  # Take screenshot every 30 seconds
+        self.last_screenshot_time = start_time
+        self.productivity_message = ""
+        self.productivity_message_time = 0
+        self.productivity_message_duration = 5  # Show message for 5 seconds
+        self.productivity_state = PRODUCTIVITY_UNKNOWN  # Last productivity verdict, for the recorder
+        self.recorder = recorder
+
+        # Gaze direction of the last frame
+        self.gaze_text = ""
+        self.current_time = start_time
+
+    @property
+    def focus_score(self):
+        return self.score.score
+
+    def screenshot_due(self, current_time):
+        """Returns true, once per interval, when a screenshot should be analyzed
+
+        Argument:
+            current_time (float): Timestamp of the frame
+        """
+        if current_time - self.last_screenshot_time >= self.screenshot_interval:
+            self.last_screenshot_time = current_time
+            return True
+        return False
+
+    def update(self, result, current_time, analysis_result=None):
+        """Updates the session with the analysis of a frame
+
+        Arguments:
+            result (gaze_tracking.GazeResult): Gaze analysis of the frame
+            current_time (float): Timestamp of the frame
+            analysis_result (str): Productivity analysis received since the last frame, if any
+        """
+        self.current_time = current_time
+
+        # Blink detection and counting
+        if result.is_blinking:
+            if not self.is_blinking_state:  # New blink detected
+                self.blink_rate.add(current_time)
+                self.last_blink_time = current_time
+                self.is_blinking_state = True
+        else:
+            self.is_blinking_state = False
+
+        # Calculate current BPM (blinks per minute) over the sliding window
+        self.blink_rate.advance(current_time)
+        self.blink_count = self.blink_rate.count(self.bpm_window)
+        self.elapsed_time = self.blink_rate.elapsed(self.bpm_window, current_time)
+        self.bpm = self.blink_rate.rate(self.bpm_window, current_time)
+        bpm = self.bpm
+
+        # Baseline establishment (first 30 seconds)
+        if not self.baseline_established:
+            baseline_elapsed = current_time - self.baseline_start_time
+            if baseline_elapsed >= self.baseline_duration:
+                # Calculate baseline BPM from the blinks of the first 30 seconds
+                self.baseline_bpm = self.blink_rate.total / baseline_elapsed * 60
+                self.baseline_established = True
+                print(f"Baseline BPM established: {self.baseline_bpm:.1f}")
+
+        # Monitor for significant changes from baseline, computed once per frame for the focus score too
+        self.change_percentage = blink_change(bpm, self.baseline_bpm)
+        if self.change_percentage is not None:
+            if self.change_percentage >= self.score.blink_threshold:
+                if bpm > self.baseline_bpm:
+                    self.change_message = "Increased Blinking Rate"
+                else:
+                    self.change_message = "Decreased Blinking Rate"
+                self.change_message_time = current_time
+
+        # Clear change message after duration
+        if current_time - self.change_message_time > self.change_message_duration:
+            self.change_message = ""
+
+        # Eye contact tracking
+        time_looking_away = None
+        if result.is_right or result.is_left:
+            # User is looking away from center
+            if self.looking_away_start_time is None:
+                self.looking_away_start_time = current_time
+            # Check if they've been looking away for more than threshold
+            time_looking_away = current_time - self.looking_away_start_time
+            if time_looking_away >= self.eye_contact_threshold:
+                self.eye_contact_message = "User has lost eye contact with screen"
+                self.eye_contact_message_time = current_time
+        else:
+            # User is looking at center (or eyes not detected)
+            self.looking_away_start_time = None
+
+        # Clear eye contact message after duration
+        if current_time - self.eye_contact_message_time > self.eye_contact_message_duration:
+            self.eye_contact_message = ""
+
+        # Productivity analysis result
+        if analysis_result:
+            if "NON-PRODUCTIVE" in analysis_result.upper():
+                self.productivity_message = f"Non-productive activity detected: {analysis_result}"
+                self.productivity_state = NON_PRODUCTIVE
+            elif "ERROR" in analysis_result.upper():
+                self.productivity_message = f"Analysis error: {analysis_result}"
+                self.productivity_state = PRODUCTIVITY_UNKNOWN
+            elif "UNKNOWN" in analysis_result.upper():
+                self.productivity_message = "Unable to determine productivity level"
+                self.productivity_state = PRODUCTIVITY_UNKNOWN
+            else:
+                self.productivity_message = "Productive activity confirmed"
+                self.productivity_state = PRODUCTIVE
+
+            self.productivity_message_time = current_time
+            print(f"Productivity analysis result: {analysis_result}")
+
+        # Clear productivity message after duration
+        if current_time - self.productivity_message_time > self.productivity_message_duration:
+            self.productivity_message = ""
+
+        # Update persistent focus score (penalties applied only once per event)
+        non_productive_reported = "NON-PRODUCTIVE" in self.productivity_message
+        self.score.update(current_time, self.change_percentage, time_looking_away, non_productive_reported)
+
+        # Stream the sample to disk
+        if self.recorder is not None:
+            self.recorder.append(current_time, bpm, result.horizontal_ratio, result.vertical_ratio,
+                                 self.focus_score, self.productivity_state, non_productive_reported)
+
+        # Update session statistics (every 5 seconds)
+        if self.session_data['data_points'] == 0 or \
+           current_time - self.session_start_time - (self.session_data['data_points'] * 5) >= 5:
+            is_productive = "PRODUCTIVE" in self.productivity_message
+            self.update_session_stats(bpm, is_productive, self.focus_score)
+
+        # Gaze direction detection
+        self.gaze_text = ""
+        if result.is_right:
+            self.gaze_text = "Looking right"
+        elif result.is_left:
+            self.gaze_text = "Looking left"
+        elif result.is_center:
+            self.gaze_text = "Looking center"
+
+    def draw(self, hud):
+        """Queues the session labels on the HUD
+
+        Argument:
+            hud (hud.Hud): Overlay renderer of the video feed
+        """
+        # Display gaze direction
+        hud.add(self.gaze_text, (60, 60), 2, (255, 0, 0), 2, static=True)
+
+        # Display blink information
+        hud.add(f"Blinks: {self.blink_count}", (60, 120), 1, (0, 255, 0), 2)
+        hud.add(f"BPM: {self.bpm:.1f}", (60, 160), 1, (0, 255, 0), 2)
+        hud.add(f"Time: {self.elapsed_time:.1f}s", (60, 200), 1, (0, 255, 0), 2)
+
+        # Display baseline information
+        if self.baseline_established:
+            hud.add(f"Baseline: {self.baseline_bpm:.1f} BPM", (60, 240), 1, (255, 255, 0), 2)
+        else:
+            baseline_remaining = self.baseline_duration - (self.current_time - self.baseline_start_time)
+            hud.add(f"Establishing baseline: {baseline_remaining:.0f}s", (60, 240), 1, (255, 255, 0), 2)
+
+        # Display change message
+        if self.change_message:
+            hud.add(self.change_message, (60, 280), 1.5, (0, 0, 255), 2, static=True)
+
+        # Display eye contact message
+        if self.eye_contact_message:
+            hud.add(self.eye_contact_message, (60, 320), 1.5, (255, 0, 255), 2, static=True)
+
+        # Display productivity message
+        if self.productivity_message:
+            hud.add(self.productivity_message, (60, 360), 1, (0, 255, 255), 2, static=True)
+
+        # Display focus score
+        hud.add(f"Focus Score: {self.focus_score:.0f}", (60, 400), 1.2, (255, 255, 255), 2)
+
+    def update_session_stats(self, bpm, is_productive, focus_score):
+        """Update session statistics"""
+        self.session_data['blink_count'] += 1 if bpm > 0 else 0
+        self.session_data['productive_time'] += 1 if is_productive else 0
+        self.session_data['distraction_count'] += 1 if not is_productive else 0
+        self.session_data['focus_score_total'] += focus_score
+        self.session_data['data_points'] += 1
+
+    def generate_session_report(self, end_time=None, reports_dir="reports"):
+        """Generate a simple session report
+
+        Arguments:
+            end_time (float): Timestamp of the end of the session, now by default
+            reports_dir (str): Folder in which the session folder is created
+        """
+        if end_time is None:
+            end_time = time.time()
+        session_data = self.session_data
+
+        session_duration = end_time - self.session_start_time
+        avg_focus_score = session_data['focus_score_total'] / session_data['data_points'] if session_data['data_points'] > 0 else 0
+        productivity_percentage = (session_data['productive_time'] / session_data['data_points'] * 100) if session_data['data_points'] > 0 else 0
+
+        # Create session folder
+        session_id = datetime.fromtimestamp(end_time).strftime("%Y%m%d_%H%M%S")
+        session_folder = os.path.join(reports_dir, f"session_{session_id}")
+        os.makedirs(session_folder, exist_ok=True)
+
+        # Generate report
+        report = f"""
+╔══════════════════════════════════════════════════════════════════════════════╗
+║                              FOCUSON SESSION REPORT                          ║
+╚══════════════════════════════════════════════════════════════════════════════╝
+
+📊 SESSION SUMMARY:
+   • Duration: {session_duration/60:.1f} minutes
+   • Total Blinks: {session_data['blink_count']}
+   • Focus Score: {avg_focus_score:.1f}/100
+   • Productivity: {productivity_percentage:.1f}%
+   • Distractions: {session_data['distraction_count']}
+
+🎯 PERFORMANCE:
+"""
+
+        if avg_focus_score >= 80:
+            report += "   • 🎉 Excellent focus maintained!\n"
+        elif avg_focus_score >= 60:
+            report += "   • 👍 Good focus with room for improvement\n"
+        else:
+            report += "   • 📉 Focus needs improvement\n"
+
+        if productivity_percentage >= 80:
+            report += "   • 🎯 High productivity achieved\n"
+        elif productivity_percentage >= 60:
+            report += "   • 📊 Moderate productivity\n"
+        else:
+            report += "   • ⚠️  Low productivity - consider environment changes\n"
+
+        report += f"""
+╔══════════════════════════════════════════════════════════════════════════════╗
+║                              END OF REPORT                                   ║
+╚══════════════════════════════════════════════════════════════════════════════╝
+"""
+
+        # Save report
+        report_file = os.path.join(session_folder, "report.txt")
+        with open(report_file, 'w') as f:
+            f.write(report)
+
+        # Save session data
+        data_file = os.path.join(session_folder, "session_data.json")
+        session_data['end_time'] = end_time
+        session_data['duration'] = session_duration
+        session_data['avg_focus_score'] = avg_focus_score
+        session_data['productivity_percentage'] = productivity_percentage
+        if self.recorder is not None:
+            self.recorder.close()
+            session_data['recording'] = self.recorder.directory
+
+        with open(data_file, 'w') as f:
+            json.dump(session_data, f, indent=2)
+
+        # Keep the session index of compare_sessions up to date
+        try:
+            index = SessionIndex(reports_dir)
+            index.add(os.path.basename(session_folder), session_data)
+            index.close()
+        except sqlite3.Error as e:
+            print(f"Unable to update the session index: {e}")
+
+        print(f"\n📁 Session data saved to: {session_folder}/")
+        print(f"📄 Report: {report_file}")
+        print(f"📊 Data: {data_file}")
+        print(report)
+        return session_folder
@@ -0,0 +1,179 @@
+import json
+import os
+import sqlite3
+import numpy as np
+
+# Metrics of session_data.json stored as columns of the index
+COLUMNS = (
+    'start_time',
+    'end_time',
+    'duration',
+    'avg_focus_score',
+    'productivity_percentage',
+    'blink_count',
+    'distraction_count',
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS sessions (
+    folder TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    {", ".join(f"{column} REAL" for column in COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS sessions_start_time ON sessions (start_time);
+"""
+
+
+class SessionIndex(object):
+    """
+    This class keeps the metrics of the session reports in a SQLite file
+    under the reports folder, so that sessions can be listed, filtered by
+    date and aggregated without parsing every session_data.json.
+    Reports are added by FocusSession.generate_session_report, and
+    refresh() picks up the folders that are new or changed since the last
+    scan, by modification time.
+    """
+
+    def __init__(self, reports_dir="reports", path=None):
+        """
+        Arguments:
+            reports_dir (str): Folder of the session reports
+            path (str): SQLite file, index/sessions.sqlite in the reports folder by default
+        """
+        self.reports_dir = reports_dir
+        # In a subfolder, so that the journal files of SQLite do not change the reports folder
+        self.path = path or os.path.join(reports_dir, "index", "sessions.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._db = sqlite3.connect(self.path)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def add(self, folder, data, mtime=None):
+        """Adds or replaces the metrics of a session
+
+        Arguments:
+            folder (str): Name of the session folder in the reports folder
+            data (dict): Content of its session_data.json
+            mtime (float): Modification time of session_data.json, read from the file by default
+        """
+        if mtime is None:
+            mtime = os.path.getmtime(os.path.join(self.reports_dir, folder, "session_data.json"))
+        with self._db:
+            self._upsert(folder, data, mtime)
+
+    def _upsert(self, folder, data, mtime):
+        values = [folder, mtime] + [data.get(column, 0) for column in COLUMNS]
+        self._db.execute(
+            f"INSERT OR REPLACE INTO sessions (folder, mtime, {', '.join(COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(values))})",
+            values,
+        )
+
+    def refresh(self, full=False):
+        """Indexes the session folders that are new or changed, and drops
+        the folders that were removed. Every folder is checked: a rewritten
+        session_data.json does not change the reports folder itself.
+        Returns the number of sessions (re)indexed.
+
+        Argument:
+            full (bool): Parse every session_data.json again, even if unchanged
+        """
+        if not os.path.isdir(self.reports_dir):
+            return 0
+
+        known = dict(self._db.execute("SELECT folder, mtime FROM sessions").fetchall())
+        found = set()
+        indexed = 0
+
+        with self._db:
+            with os.scandir(self.reports_dir) as entries:
+                for entry in entries:
+                    if not entry.name.startswith("session_") or not entry.is_dir():
+                        continue
+                    data_file = os.path.join(entry.path, "session_data.json")
+                    try:
+                        mtime = os.stat(data_file).st_mtime
+                    except OSError:
+                        continue
+                    found.add(entry.name)
+                    if not full and known.get(entry.name) == mtime:
+                        continue
+
+                    try:
+                        with open(data_file, 'r') as f:
+                            data = json.load(f)
+                    except (OSError, ValueError) as e:
+                        print(f"Error loading {data_file}: {e}")
+                        continue
+                    self._upsert(entry.name, data, mtime)
+                    indexed += 1
+
+            removed = [(folder,) for folder in known if folder not in found]
+            self._db.executemany("DELETE FROM sessions WHERE folder = ?", removed)
+
+        return indexed
+
+    @staticmethod
+    def _where(start, end):
+        """Returns the WHERE clause and parameters of a date range"""
+        conditions, parameters = [], []
+        if start is not None:
+            conditions.append("start_time >= ?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("start_time < ?")
+            parameters.append(end)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), parameters
+
+    def sessions(self, start=None, end=None):
+        """Returns the sessions started in a date range as dictionaries, sorted by start time
+
+        Arguments:
+            start (float): Timestamp from which sessions are returned
+            end (float): Timestamp before which sessions are returned
+        """
+        where, parameters = self._where(start, end)
+        rows = self._db.execute(f"SELECT * FROM sessions{where} ORDER BY start_time", parameters)
+        return [dict(row) for row in rows]
+
+    def arrays(self, columns=COLUMNS, start=None, end=None):
+        """Returns the metrics of the sessions started in a date range as
+        NumPy arrays, one per column, sorted by start time
+
+        Arguments:
+            columns (tuple): Metrics to return, among COLUMNS
+            start (float): Timestamp from which sessions are returned
+            end (float): Timestamp before which sessions are returned
+        """
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown session metrics: {', '.join(sorted(unknown))}")
+
+        where, parameters = self._where(start, end)
+        cursor = self._db.cursor()
+        cursor.row_factory = None  # Plain tuples, much faster to build than sqlite3.Row
+        rows = cursor.execute(f"SELECT {', '.join(columns)} FROM sessions{where} ORDER BY start_time", parameters)
+        table = np.array(rows.fetchall(), float).reshape(-1, len(columns))
+        return {column: table[:, i] for i, column in enumerate(columns)}
+
+    def aggregate(self, start=None, end=None):
+        """Returns the number of sessions started in a date range, their total
+        duration and their average focus score and productivity
+
+        Arguments:
+            start (float): Timestamp from which sessions are aggregated
+            end (float): Timestamp before which sessions are aggregated
+        """
+        where, parameters = self._where(start, end)
+        row = self._db.execute(
+            "SELECT COUNT(*) AS sessions, SUM(duration) AS total_duration, "
+            "AVG(avg_focus_score) AS avg_focus_score, AVG(productivity_percentage) AS avg_productivity, "
+            "MIN(avg_focus_score) AS min_focus_score, MAX(avg_focus_score) AS max_focus_score, "
+            f"SUM(blink_count) AS blink_count, SUM(distraction_count) AS distraction_count FROM sessions{where}",
+            parameters,
+        ).fetchone()
+        return dict(row)
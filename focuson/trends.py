@@ -0,0 +1,194 @@
+import csv
+import json
+import os
+import time
+import numpy as np
+
+WEEK = 7 * 24 * 3600
+METRICS = ('avg_focus_score', 'productivity_percentage')
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def rolling_mean(values, window):
+    """Returns the mean of each value and the window - 1 values before it,
+    NaN while fewer values are available
+
+    Arguments:
+        values (numpy.ndarray): Values in time order
+        window (int): Number of values averaged
+    """
+    means = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        means[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return means
+
+
+def _utc_offsets(timestamps):
+    """Returns the offset of local time from UTC at each timestamp, in
+    seconds, so that dates on both sides of a DST change are right"""
+    return np.array([time.localtime(t).tm_gmtoff for t in np.asarray(timestamps, float).tolist()], dtype=float)
+
+
+def _mondays(timestamps):
+    """Returns the local Monday of the week of each timestamp, in days since 1970-01-01"""
+    days = np.floor((np.asarray(timestamps, float) + _utc_offsets(timestamps)) / (24 * 3600)).astype(np.int64)
+    # 1970-01-01 was a Thursday, the week began 3 days before
+    return days - (days + 3) % 7
+
+
+def _local_midnights(days):
+    """Returns the timestamps of 00:00 local time of days since 1970-01-01"""
+    dates = np.asarray(days, 'datetime64[D]').tolist()
+    return np.array([time.mktime((d.year, d.month, d.day, 0, 0, 0, 0, 0, -1)) for d in dates], dtype=float)
+
+
+def week_starts(timestamps):
+    """Returns the timestamp of the Monday, 00:00 local time, of the week of each timestamp"""
+    mondays, index = np.unique(_mondays(timestamps), return_inverse=True)
+    return _local_midnights(mondays)[index]
+
+
+def regression(x, values):
+    """Returns the slope, intercept and coefficient of determination of
+    the least squares lines of each row of values
+
+    Arguments:
+        x (numpy.ndarray): Abscissas, of shape (n,)
+        values (numpy.ndarray): Ordinates, of shape (metrics, n)
+    """
+    x_centered = x - x.mean()
+    values_centered = values - values.mean(axis=1, keepdims=True)
+    variance = np.dot(x_centered, x_centered)
+    if variance == 0:
+        nan = np.full(len(values), np.nan)
+        return nan, nan, nan
+
+    slope = values_centered @ x_centered / variance
+    intercept = values.mean(axis=1) - slope * x.mean()
+    residuals = values_centered - slope[:, None] * x_centered
+    total = np.einsum('ij,ij->i', values_centered, values_centered)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r_squared = 1 - np.einsum('ij,ij->i', residuals, residuals) / total
+    return slope, intercept, r_squared
+
+
+def compute_trends(start_times, metrics, window=7):
+    """Computes the trends of the session metrics over the whole history,
+    with array operations, besides the conversions to local time
+
+    Arguments:
+        start_times (numpy.ndarray): Start time of each session, sorted, at least one
+        metrics (dict): Array of values per metric name, in session order
+        window (int): Number of sessions of the rolling averages
+
+    Returns:
+        A dictionary with the per-session rolling averages, the weekly means
+        and week-over-week deltas, the percentiles and the regressions
+    """
+    names = list(metrics)
+    values = np.vstack([np.asarray(metrics[name], float) for name in names])
+
+    # Weekly means, from the sums and counts of the sessions of each week
+    mondays = _mondays(start_times)
+    first = mondays.min()
+    week_index = (mondays - first) // 7
+    all_counts = np.bincount(week_index)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        all_weekly = np.vstack([np.bincount(week_index, row, len(all_counts)) for row in values]) / all_counts
+    # Over every week of the range, so that a week without sessions leaves the next delta NaN
+    deltas = np.diff(all_weekly, axis=1, prepend=np.nan)
+    present = np.flatnonzero(all_counts)
+    weeks = _local_midnights(first + 7 * present)
+    counts, weekly, deltas = all_counts[present], all_weekly[:, present], deltas[:, present]
+
+    # Regressions against the time since the first session, in days
+    days = (start_times - start_times[0]) / (24 * 3600)
+    slope, intercept, r_squared = regression(days, values)
+    percentiles = np.percentile(values, PERCENTILES, axis=1)
+
+    return {
+        'sessions': len(start_times),
+        'window': window,
+        'rolling': {name: rolling_mean(row, window) for name, row in zip(names, values)},
+        'weeks': weeks,
+        'weekly_sessions': counts,
+        'weekly': dict(zip(names, weekly)),
+        'weekly_delta': dict(zip(names, deltas)),
+        'percentiles': {name: dict(zip(PERCENTILES, percentiles[:, i])) for i, name in enumerate(names)},
+        'regression': {
+            name: {'slope_per_day': slope[i], 'intercept': intercept[i], 'r_squared': r_squared[i]}
+            for i, name in enumerate(names)
+        },
+    }
+
+
+def _json_value(value):
+    """Converts NumPy scalars to JSON values, NaN to None"""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _dates(timestamps, unit):
+    """Formats timestamps as local dates, to the day ('D') or the minute ('m')"""
+    local = (np.asarray(timestamps, float) + _utc_offsets(timestamps)).astype('datetime64[s]')
+    return np.datetime_as_string(local, unit=unit)
+
+
+def _csv_values(row):
+    """Leaves the NaN cells of a CSV row empty"""
+    return ["" if value != value else value for value in row]
+
+
+def save_trends(trends, start_times, metrics, output_dir):
+    """Writes the trends to output_dir: sessions.csv (metrics and rolling
+    averages per session), weekly.csv (means and deltas per week) and
+    trends.json (everything, with the percentiles and regressions).
+    Returns the paths of the files.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    names = list(metrics)
+
+    sessions_file = os.path.join(output_dir, "sessions.csv")
+    with open(sessions_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['start_time', 'date'] + names + [f"{name}_rolling" for name in names])
+        columns = [start_times] + [metrics[name] for name in names] + [trends['rolling'][name] for name in names]
+        # Rounded, the values are formatted twice as fast
+        rows = np.round(np.column_stack(columns), 3).tolist()
+        writer.writerows([row[0], date] + _csv_values(row[1:]) for date, row in zip(_dates(start_times, 'm'), rows))
+
+    weekly_file = os.path.join(output_dir, "weekly.csv")
+    with open(weekly_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['week', 'sessions'] + names + [f"{name}_delta" for name in names])
+        weeks = _dates(trends['weeks'], 'D').tolist()
+        columns = [trends['weekly'][name] for name in names] + [trends['weekly_delta'][name] for name in names]
+        rows = np.round(np.column_stack(columns), 3).tolist()
+        for week, count, row in zip(weeks, trends['weekly_sessions'].tolist(), rows):
+            writer.writerow([week, count] + _csv_values(row))
+
+    json_file = os.path.join(output_dir, "trends.json")
+    summary = {
+        'sessions': trends['sessions'],
+        'window': trends['window'],
+        'percentiles': {
+            name: {str(p): _json_value(v) for p, v in values.items()} for name, values in trends['percentiles'].items()
+        },
+        'regression': {
+            name: {key: _json_value(v) for key, v in values.items()} for name, values in trends['regression'].items()
+        },
+        'weekly': [
+            dict(
+                week=week,
+                sessions=count,
+                **{name: _json_value(trends['weekly'][name][i]) for name in names},
+                **{f"{name}_delta": _json_value(trends['weekly_delta'][name][i]) for name in names},
+            )
+            for i, (week, count) in enumerate(zip(weeks, trends['weekly_sessions'].tolist()))
+        ],
+    }
+    with open(json_file, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    return [sessions_file, weekly_file, json_file]
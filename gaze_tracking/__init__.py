@@ -1 +1,3 @@
 from .gaze_tracking import GazeTracking
+from .gaze_result import GazeResult
+from .scheduler import AnalysisScheduler
@@ -1,4 +1,5 @@
 from __future__ import division
+import numpy as np
 import cv2
 from .pupil import Pupil
 
@@ -9,8 +10,15 @@ class Calibration(object):
     best binarization threshold value for the person and the webcam.
     """
 
-    def __init__(self):
+    def __init__(self, thresholds=range(5, 100, 5), mode=Pupil.ACCURATE):
+        """
+        Arguments:
+            thresholds (iterable): Candidate threshold values, between 0 and 255
+            mode (str): Pupil detection mode the thresholds are calibrated for
+        """
         self.nb_frames = 20
+        self.thresholds = thresholds
+        self.mode = mode
         self.thresholds_left = []
         self.thresholds_right = []
 
@@ -44,22 +52,32 @@ class Calibration(object):
         return nb_blacks / nb_pixels
 
     @staticmethod
-    def find_best_threshold(eye_frame):
+    def find_best_threshold(eye_frame, thresholds=range(5, 100, 5), mode=Pupil.ACCURATE):
         """Calculates the optimal threshold to binarize the
         frame for the given eye.
 
-        Argument:
+        The eye frame is filtered only once: the iris size for every
+        candidate threshold is read from the cumulative histogram of
+        the filtered frame, so finer threshold steps come at no cost.
+
+        Arguments:
             eye_frame (numpy.ndarray): Frame of the eye to be analyzed
+            thresholds (iterable): Candidate threshold values, between 0 and 255
+            mode (str): Pupil detection mode, the frame is filtered as it does
         """
         average_iris_size = 0.48
-        trials = {}
 
-        for threshold in range(5, 100, 5):
-            iris_frame = Pupil.image_processing(eye_frame, threshold)
-            trials[threshold] = Calibration.iris_size(iris_frame)
+        new_frame = Pupil.preprocess(eye_frame, mode)[5:-5, 5:-5]
+        nb_pixels = new_frame.size
+
+        # Binarization keeps the pixels above the threshold, so the number of
+        # black pixels for a threshold is the count of values lower or equal to it
+        nb_blacks = np.cumsum(np.bincount(new_frame.ravel(), minlength=256))
+        thresholds = np.fromiter(thresholds, dtype=np.intp)
+        iris_sizes = nb_blacks[thresholds] / nb_pixels
 
-        best_threshold, iris_size = min(trials.items(), key=(lambda p: abs(p[1] - average_iris_size)))
-        return best_threshold
+        best_threshold = thresholds[np.argmin(np.abs(iris_sizes - average_iris_size))]
+        return int(best_threshold)
 
     def evaluate(self, eye_frame, side):
         """Improves calibration by taking into consideration the
@@ -69,7 +87,7 @@ class Calibration(object):
             eye_frame (numpy.ndarray): Frame of the eye
             side: Indicates whether it's the left eye (0) or the right eye (1)
         """
-        threshold = self.find_best_threshold(eye_frame)
+        threshold = self.find_best_threshold(eye_frame, self.thresholds, self.mode)
 
         if side == 0:
             self.thresholds_left.append(threshold)
@@ -1,17 +1,65 @@
-import math
 import numpy as np
 import cv2
 from .pupil import Pupil
 
 
+class EyeLandmarks(object):
+    """
+    This class holds the contour points of both eyes as a single array,
+    converted once per frame from the dlib landmarks, and computes the
+    blinking ratios and bounding boxes of both eyes with array operations.
+    """
+
+    LEFT_EYE_POINTS = [36, 37, 38, 39, 40, 41]
+    RIGHT_EYE_POINTS = [42, 43, 44, 45, 46, 47]
+    MARGIN = 5  # Margin of the eye bounding boxes, in pixels
+
+    def __init__(self, landmarks):
+        """
+        Argument:
+            landmarks (dlib.full_object_detection): Facial landmarks for the face region
+        """
+        parts = [landmarks.part(point) for point in self.LEFT_EYE_POINTS + self.RIGHT_EYE_POINTS]
+        # Left and right eye, six points, x and y
+        self.points = np.array([(part.x, part.y) for part in parts], np.int32).reshape(2, 6, 2)
+        self.blinking_ratios = self._blinking_ratios(self.points)
+        self.boxes = self._boxes(self.points)
+
+    @staticmethod
+    def _blinking_ratios(points):
+        """Calculates, for each eye, a ratio that can indicate whether it is
+        closed or not. It's the division of the width of the eye, by its height.
+
+        Argument:
+            points (numpy.ndarray): Contour points of both eyes, of shape (2, 6, 2)
+
+        Returns:
+            The ratios of the left and right eye, None for an eye of null height
+        """
+        # Middles of the upper and lower eyelids, truncated to pixels
+        middles = ((points[:, [1, 5]] + points[:, [2, 4]]) / 2).astype(np.int32)
+        # Width (corner to corner) and height (eyelid to eyelid) vectors of both eyes
+        vectors = np.stack((points[:, 0] - points[:, 3], middles[:, 0] - middles[:, 1]), axis=1)
+        widths, heights = np.hypot(vectors[..., 0], vectors[..., 1]).T.tolist()
+        return [width / height if height else None for width, height in zip(widths, heights)]
+
+    @classmethod
+    def _boxes(cls, points):
+        """Returns the bounding boxes of both eyes with their margin, as
+        (min_x, min_y, max_x, max_y) tuples, not clipped to the frame
+        """
+        boxes = np.concatenate((points.min(axis=1) - cls.MARGIN, points.max(axis=1) + cls.MARGIN), axis=1)
+        return [tuple(box) for box in boxes.tolist()]
+
+
 class Eye(object):
     """
     This class creates a new frame to isolate the eye and
     initiates the pupil detection.
     """
 
-    LEFT_EYE_POINTS = [36, 37, 38, 39, 40, 41]
-    RIGHT_EYE_POINTS = [42, 43, 44, 45, 46, 47]
+    LEFT_EYE_POINTS = EyeLandmarks.LEFT_EYE_POINTS
+    RIGHT_EYE_POINTS = EyeLandmarks.RIGHT_EYE_POINTS
 
     def __init__(self, original_frame, landmarks, side, calibration):
         self.frame = None
@@ -22,98 +70,54 @@ class Eye(object):
 
         self._analyze(original_frame, landmarks, side, calibration)
 
-    @staticmethod
-    def _middle_point(p1, p2):
-        """Returns the middle point (x,y) between two points
-
-        Arguments:
-            p1 (dlib.point): First point
-            p2 (dlib.point): Second point
-        """
-        x = int((p1.x + p2.x) / 2)
-        y = int((p1.y + p2.y) / 2)
-        return (x, y)
-
-    def _isolate(self, frame, landmarks, points):
+    def _isolate(self, frame, region, bounds):
         """Isolate an eye, to have a frame without other part of the face.
 
         Arguments:
             frame (numpy.ndarray): Frame containing the face
-            landmarks (dlib.full_object_detection): Facial landmarks for the face region
-            points (list): Points of an eye (from the 68 Multi-PIE landmarks)
+            region (numpy.ndarray): Contour points of the eye, of shape (6, 2)
+            bounds (tuple): Bounding box of the contour with its margin (min_x, min_y, max_x, max_y)
         """
-        region = np.array([(landmarks.part(point).x, landmarks.part(point).y) for point in points])
-        region = region.astype(np.int32)
         self.landmark_points = region
 
-        # Applying a mask to get only the eye
-        height, width = frame.shape[:2]
-        black_frame = np.zeros((height, width), np.uint8)
-        mask = np.full((height, width), 255, np.uint8)
-        cv2.fillPoly(mask, [region], (0, 0, 0))
-        eye = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
-
         # Cropping on the eye
-        margin = 5
-        min_x = np.min(region[:, 0]) - margin
-        max_x = np.max(region[:, 0]) + margin
-        min_y = np.min(region[:, 1]) - margin
-        max_y = np.max(region[:, 1]) + margin
-
-        self.frame = eye[min_y:max_y, min_x:max_x]
+        height, width = frame.shape[:2]
+        min_x, min_y, max_x, max_y = bounds
+        min_x, min_y = max(min_x, 0), max(min_y, 0)
+        max_x, max_y = min(max_x, width), min(max_y, height)
+
+        # Applying a mask to get only the eye, within the cropped box
+        box = frame[min_y:max_y, min_x:max_x]
+        black_box = np.zeros(box.shape[:2], np.uint8)
+        mask = np.full(box.shape[:2], 255, np.uint8)
+        cv2.fillPoly(mask, [region - np.array((min_x, min_y), np.int32)], (0, 0, 0))
+        eye = cv2.bitwise_not(black_box, box.copy(), mask=mask)
+
+        self.frame = eye
         self.origin = (min_x, min_y)
 
         height, width = self.frame.shape[:2]
         self.center = (width / 2, height / 2)
 
-    def _blinking_ratio(self, landmarks, points):
-        """Calculates a ratio that can indicate whether an eye is closed or not.
-        It's the division of the width of the eye, by its height.
-
-        Arguments:
-            landmarks (dlib.full_object_detection): Facial landmarks for the face region
-            points (list): Points of an eye (from the 68 Multi-PIE landmarks)
-
-        Returns:
-            The computed ratio
-        """
-        left = (landmarks.part(points[0]).x, landmarks.part(points[0]).y)
-        right = (landmarks.part(points[3]).x, landmarks.part(points[3]).y)
-        top = self._middle_point(landmarks.part(points[1]), landmarks.part(points[2]))
-        bottom = self._middle_point(landmarks.part(points[5]), landmarks.part(points[4]))
-
-        eye_width = math.hypot((left[0] - right[0]), (left[1] - right[1]))
-        eye_height = math.hypot((top[0] - bottom[0]), (top[1] - bottom[1]))
-
-        try:
-            ratio = eye_width / eye_height
-        except ZeroDivisionError:
-            ratio = None
-
-        return ratio
-
     def _analyze(self, original_frame, landmarks, side, calibration):
         """Detects and isolates the eye in a new frame, sends data to the calibration
         and initializes Pupil object.
 
         Arguments:
             original_frame (numpy.ndarray): Frame passed by the user
-            landmarks (dlib.full_object_detection): Facial landmarks for the face region
+            landmarks (EyeLandmarks): Contour points, ratios and boxes of both eyes
             side: Indicates whether it's the left eye (0) or the right eye (1)
-            calibration (calibration.Calibration): Manages the binarization threshold value
+            calibration (calibration.Calibration): Manages the binarization threshold value,
+                for its pupil detection mode
         """
-        if side == 0:
-            points = self.LEFT_EYE_POINTS
-        elif side == 1:
-            points = self.RIGHT_EYE_POINTS
-        else:
+        if side not in (0, 1):
             return
 
-        self.blinking = self._blinking_ratio(landmarks, points)
-        self._isolate(original_frame, landmarks, points)
+        self.blinking = landmarks.blinking_ratios[side]
+        self._isolate(original_frame, landmarks.points[side], landmarks.boxes[side])
 
         if not calibration.is_complete():
             calibration.evaluate(self.frame, side)
 
         threshold = calibration.threshold(side)
-        self.pupil = Pupil(self.frame, threshold)
+        self.pupil = Pupil(self.frame, threshold, calibration.mode)
@@ -0,0 +1,20 @@
+from collections import namedtuple
+
+
+class GazeResult(namedtuple("GazeResult", [
+        "pupils_located", "pupil_left", "pupil_right", "horizontal_ratio", "vertical_ratio",
+        "blinking_ratio", "is_right", "is_left", "is_center", "is_blinking"])):
+    """
+    This class is an immutable snapshot of the gaze analysis of one frame.
+    Ratios and direction flags are computed once per frame, so callers read
+    fields instead of recomputing them, and the value can be safely passed
+    between threads.
+
+    When the pupils are not located, pupils_located is False and the other
+    fields are None.
+    """
+
+    __slots__ = ()
+
+
+GazeResult.EMPTY = GazeResult(False, None, None, None, None, None, None, None, None, None)
@@ -1,9 +1,13 @@
 from __future__ import division
 import os
+import threading
+import time
+import numpy as np
 import cv2
 import dlib
-from .eye import Eye
+from .eye import Eye, EyeLandmarks
 from .calibration import Calibration
+from .gaze_result import GazeResult
 
 
 class GazeTracking(object):
@@ -13,19 +17,122 @@ class GazeTracking(object):
     and pupils and allows to know if the eyes are open or closed
     """
 
-    def __init__(self):
+    def __init__(self, tracking=False, redetect_interval=10, tracking_padding=0.5, tracking_threshold=0.0,
+                 detection_scale=1.0, detection_width=None, metrics=None, load_models=True, pupil_mode="accurate"):
+        """
+        Arguments:
+            tracking (bool): Reuse the face box of the previous frame and only
+                search a padded region around it instead of the whole frame
+            redetect_interval (int): When tracking, number of frames after which
+                a full-frame detection is forced
+            tracking_padding (float): Padding added around the previous face box,
+                as a fraction of its size
+            tracking_threshold (float): Minimum detector score in the tracked region,
+                below it a full-frame detection is run
+            detection_scale (float): Scale of the image given to the face detector,
+                landmarks are still predicted on the full resolution frame
+            detection_width (int): If set, frames wider than this are downscaled to
+                this width for the face detector, whatever the camera resolution
+            metrics: If set, receives the latency of the detection, landmarks and
+                pupils stages through its observe(stage, seconds) method
+            load_models (bool): Load the face detector and the landmarks model now.
+                If false, they are loaded by load_models(), or by
+                load_models_in_background() while the camera starts for instance
+            pupil_mode (str): "accurate" (bilateral filter and contours) or "fast"
+                (Gaussian blur and connected components), see Pupil
+        """
         self.frame = None
         self.eye_left = None
         self.eye_right = None
-        self.calibration = Calibration()
+        self.result = GazeResult.EMPTY
+        self.calibration = Calibration(mode=pupil_mode)
+
+        self.tracking = tracking
+        self.redetect_interval = redetect_interval
+        self.tracking_padding = tracking_padding
+        self.tracking_threshold = tracking_threshold
+        self.detection_scale = detection_scale
+        self.detection_width = detection_width
+        self.metrics = metrics
+        self._face = None
+        self._frames_since_detection = 0
+
+        self._face_detector = None
+        self._predictor = None
+        self.models_load_time = None
+        self._models_loaded = threading.Event()
+        self._models_lock = threading.Lock()
+        self._models_error = None
+        self._models_thread = None
+        if load_models:
+            self.load_models()
+
+    def load_models(self):
+        """Loads the face detector and the landmarks model, unless they are
+        already loaded. Returns the time it took, in seconds.
+        """
+        with self._models_lock:
+            if self._models_loaded.is_set():
+                return self.models_load_time
+            start = time.perf_counter()
+
+            try:
+                # _face_detector is used to detect faces
+                self._face_detector = dlib.get_frontal_face_detector()
 
-        # _face_detector is used to detect faces
-        self._face_detector = dlib.get_frontal_face_detector()
+                # _predictor is used to get facial landmarks of a given face
+                cwd = os.path.abspath(os.path.dirname(__file__))
+                model_path = os.path.abspath(os.path.join(cwd, "trained_models/shape_predictor_68_face_landmarks.dat"))
+                self._predictor = dlib.shape_predictor(model_path)
+            except Exception as e:
+                self._models_error = e
+                raise
+            finally:
+                self.models_load_time = time.perf_counter() - start
+                self._models_loaded.set()
+            return self.models_load_time
 
-        # _predictor is used to get facial landmarks of a given face
-        cwd = os.path.abspath(os.path.dirname(__file__))
-        model_path = os.path.abspath(os.path.join(cwd, "trained_models/shape_predictor_68_face_landmarks.dat"))
-        self._predictor = dlib.shape_predictor(model_path)
+    def load_models_in_background(self):
+        """Starts loading the models on a background thread and returns the
+        gaze tracking. The first refresh() waits for the models if needed.
+        """
+        if self._models_thread is None:
+            self._models_thread = threading.Thread(target=self._load_models_quietly, name="GazeTrackingModels",
+                                                   daemon=True)
+            self._models_thread.start()
+        return self
+
+    def _load_models_quietly(self):
+        """Loads the models on the background thread, the error is raised by refresh()"""
+        try:
+            self.load_models()
+        except Exception:
+            pass
+
+    def wait_for_models(self, timeout=None):
+        """Waits until the models are loaded. Returns false on timeout, and
+        raises the error of the loading if it failed.
+
+        Argument:
+            timeout (float): Maximum time to wait, in seconds
+        """
+        if not self._models_loaded.wait(timeout):
+            return False
+        if self._models_error is not None:
+            raise self._models_error
+        return True
+
+    def _require_models(self):
+        """Loads the models, or waits for their loading in the background, if needed"""
+        if self._predictor is None:
+            if self._models_thread is None:
+                self.load_models()
+            self.wait_for_models()
+
+    @property
+    def face(self):
+        """Face box (dlib.rectangle) of the last analyzed frame, None if there was no face"""
+        return self._face
 
     @property
     def pupils_located(self):
@@ -39,92 +146,239 @@ class GazeTracking(object):
         except Exception:
             return False
 
+    def _scale(self, frame):
+        """Returns the scale at which the face detector sees the frame
+
+        Argument:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        width = frame.shape[1]
+        if self.detection_width is not None and width > self.detection_width:
+            return self.detection_width / width
+        return self.detection_scale
+
+    def _run_detector(self, frame, scale, adjust_threshold=0.0):
+        """Runs the face detector on a downscaled copy of the frame.
+        Returns the detected faces, mapped back to the coordinates
+        of the given frame, and their scores.
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+            scale (float): Scale of the image given to the detector
+            adjust_threshold (float): Minimum detection score
+        """
+        if scale != 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            frame = np.ascontiguousarray(frame)
+
+        faces, scores, _ = self._face_detector.run(frame, 0, adjust_threshold)
+
+        if scale != 1.0:
+            faces = [dlib.rectangle(int(face.left() / scale), int(face.top() / scale),
+                                    int(face.right() / scale), int(face.bottom() / scale)) for face in faces]
+        return faces, scores
+
+    def _track_face(self, frame, scale):
+        """Searches the face in a padded region around the face box
+        of the previous frame. Returns None if the face is lost or
+        if the detection score is too low.
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+            scale (float): Scale of the image given to the detector
+        """
+        height, width = frame.shape[:2]
+        pad_x = int(self._face.width() * self.tracking_padding)
+        pad_y = int(self._face.height() * self.tracking_padding)
+        left = max(self._face.left() - pad_x, 0)
+        top = max(self._face.top() - pad_y, 0)
+        right = min(self._face.right() + pad_x, width)
+        bottom = min(self._face.bottom() + pad_y, height)
+
+        faces, scores = self._run_detector(frame[top:bottom, left:right], scale, self.tracking_threshold)
+        if len(faces) == 0:
+            return None
+
+        best = max(range(len(faces)), key=lambda i: scores[i])
+        face = faces[best]
+        return dlib.rectangle(face.left() + left, face.top() + top, face.right() + left, face.bottom() + top)
+
+    def _detect_face(self, frame):
+        """Returns the rectangle of the face to analyze, or None if
+        there is no face in the frame.
+
+        Argument:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        scale = self._scale(frame)
+
+        if self.tracking and self._face is not None and self._frames_since_detection < self.redetect_interval:
+            face = self._track_face(frame, scale)
+            if face is not None:
+                self._face = face
+                self._frames_since_detection += 1
+                return face
+
+        faces, _ = self._run_detector(frame, scale)
+        self._face = faces[0] if len(faces) > 0 else None
+        self._frames_since_detection = 0
+        return self._face
+
+    def detect_faces(self, frame, scale=None):
+        """Runs the face detector on a whole grayscale frame, without the
+        tracking of refresh(), and returns the faces found. It times the
+        detection stage on its own, in benchmarks for instance.
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+            scale (float): Scale of the image given to the detector, that of refresh() by default
+        """
+        self._require_models()
+        return self._run_detector(frame, self._scale(frame) if scale is None else scale)[0]
+
+    def predict_landmarks(self, frame, face):
+        """Returns the facial landmarks (dlib.full_object_detection) of a face
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+            face (dlib.rectangle): Face box, from detect_faces() for instance
+        """
+        self._require_models()
+        return self._predictor(frame, face)
+
+    def _lap(self, stage, start):
+        """Reports the latency of a stage to the metrics, if any, and
+        returns the start time of the next stage.
+        """
+        if self.metrics is None:
+            return start
+        now = time.perf_counter()
+        self.metrics.observe(stage, now - start)
+        return now
+
     def _analyze(self):
         """Detects the face and initialize Eye objects"""
+        start = time.perf_counter() if self.metrics is not None else 0
         frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
-        faces = self._face_detector(frame)
-
-        try:
-            landmarks = self._predictor(frame, faces[0])
-            self.eye_left = Eye(frame, landmarks, 0, self.calibration)
-            self.eye_right = Eye(frame, landmarks, 1, self.calibration)
+        face = self._detect_face(frame)
+        start = self._lap("detection", start)
 
-        except IndexError:
+        if face is None:
             self.eye_left = None
             self.eye_right = None
+            return
+
+        landmarks = EyeLandmarks(self._predictor(frame, face))
+        start = self._lap("landmarks", start)
+        self.eye_left = Eye(frame, landmarks, 0, self.calibration)
+        self.eye_right = Eye(frame, landmarks, 1, self.calibration)
+        self._lap("pupils", start)
+
+    def _compute_result(self):
+        """Returns the GazeResult of the analyzed frame"""
+        if not self.pupils_located:
+            return GazeResult.EMPTY
+
+        left, right = self.eye_left, self.eye_right
+        pupil_left = (left.origin[0] + left.pupil.x, left.origin[1] + left.pupil.y)
+        pupil_right = (right.origin[0] + right.pupil.x, right.origin[1] + right.pupil.y)
+
+        horizontal_ratio = (left.pupil.x / (left.center[0] * 2 - 10) + right.pupil.x / (right.center[0] * 2 - 10)) / 2
+        vertical_ratio = (left.pupil.y / (left.center[1] * 2 - 10) + right.pupil.y / (right.center[1] * 2 - 10)) / 2
+
+        if left.blinking is not None and right.blinking is not None:
+            blinking_ratio = (left.blinking + right.blinking) / 2
+        else:
+            blinking_ratio = None
+
+        is_right = horizontal_ratio <= 0.45
+        is_left = horizontal_ratio >= 0.70
+        return GazeResult(
+            pupils_located=True,
+            pupil_left=pupil_left,
+            pupil_right=pupil_right,
+            horizontal_ratio=horizontal_ratio,
+            vertical_ratio=vertical_ratio,
+            blinking_ratio=blinking_ratio,
+            is_right=is_right,
+            is_left=is_left,
+            is_center=not is_right and not is_left,
+            is_blinking=blinking_ratio is not None and blinking_ratio > 3.8,
+        )
 
     def refresh(self, frame):
         """Refreshes the frame and analyzes it.
 
         Arguments:
             frame (numpy.ndarray): The frame to analyze
+
+        Returns:
+            The GazeResult of the frame, also kept in the result attribute
         """
+        self._require_models()
         self.frame = frame
         self._analyze()
+        self.result = self._compute_result()
+        return self.result
+
+    def reuse(self, frame):
+        """Keeps the result of the last analyzed frame for a new frame,
+        without analyzing it: annotated_frame() draws the previous pupils
+        on the new frame. Returns that result.
+
+        Argument:
+            frame (numpy.ndarray): The frame whose analysis is skipped
+        """
+        self.frame = frame
+        return self.result
 
     def pupil_left_coords(self):
         """Returns the coordinates of the left pupil"""
-        if self.pupils_located:
-            x = self.eye_left.origin[0] + self.eye_left.pupil.x
-            y = self.eye_left.origin[1] + self.eye_left.pupil.y
-            return (x, y)
+        return self.result.pupil_left
 
     def pupil_right_coords(self):
         """Returns the coordinates of the right pupil"""
-        if self.pupils_located:
-            x = self.eye_right.origin[0] + self.eye_right.pupil.x
-            y = self.eye_right.origin[1] + self.eye_right.pupil.y
-            return (x, y)
+        return self.result.pupil_right
 
     def horizontal_ratio(self):
         """Returns a number between 0.0 and 1.0 that indicates the
         horizontal direction of the gaze. The extreme right is 0.0,
         the center is 0.5 and the extreme left is 1.0
         """
-        if self.pupils_located:
-            pupil_left = self.eye_left.pupil.x / (self.eye_left.center[0] * 2 - 10)
-            pupil_right = self.eye_right.pupil.x / (self.eye_right.center[0] * 2 - 10)
-            return (pupil_left + pupil_right) / 2
+        return self.result.horizontal_ratio
 
     def vertical_ratio(self):
         """Returns a number between 0.0 and 1.0 that indicates the
         vertical direction of the gaze. The extreme top is 0.0,
         the center is 0.5 and the extreme bottom is 1.0
         """
-        if self.pupils_located:
-            pupil_left = self.eye_left.pupil.y / (self.eye_left.center[1] * 2 - 10)
-            pupil_right = self.eye_right.pupil.y / (self.eye_right.center[1] * 2 - 10)
-            return (pupil_left + pupil_right) / 2
+        return self.result.vertical_ratio
 
     def is_right(self):
         """Returns true if the user is looking to the right"""
-        if self.pupils_located:
-            return self.horizontal_ratio() <= 0.45
+        return self.result.is_right
 
     def is_left(self):
         """Returns true if the user is looking to the left"""
-        if self.pupils_located:
-            return self.horizontal_ratio() >= 0.70
+        return self.result.is_left
 
     def is_center(self):
         """Returns true if the user is looking to the center"""
-        if self.pupils_located:
-            return self.is_right() is not True and self.is_left() is not True
+        return self.result.is_center
 
     def is_blinking(self):
         """Returns true if the user closes his eyes"""
-        if self.pupils_located:
-            blinking_ratio = (self.eye_left.blinking + self.eye_right.blinking) / 2
-            return blinking_ratio > 3.8
+        return self.result.is_blinking
 
     def annotated_frame(self):
         """Returns the main frame with pupils highlighted"""
         frame = self.frame.copy()
 
-        if self.pupils_located:
+        if self.result.pupils_located:
             color = (0, 255, 0)
-            x_left, y_left = self.pupil_left_coords()
-            x_right, y_right = self.pupil_right_coords()
+            x_left, y_left = self.result.pupil_left
+            x_right, y_right = self.result.pupil_right
             cv2.line(frame, (x_left - 5, y_left), (x_left + 5, y_left), color)
             cv2.line(frame, (x_left, y_left - 5), (x_left, y_left + 5), color)
             cv2.line(frame, (x_right - 5, y_right), (x_right + 5, y_right), color)
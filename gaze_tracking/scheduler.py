@@ -0,0 +1,148 @@
+import time
+import cv2
+
+
+class AnalysisScheduler(object):
+    """
+    This class sits in front of GazeTracking and decides, frame by frame,
+    whether the frame is worth a full analysis. It compares a small
+    thumbnail of the frame, and of the eyes area, with the ones of the
+    last analyzed frame. While nothing moves, the previous GazeResult is
+    reused. Motion, or eyes that may be blinking, bring the analysis back
+    to every frame for a while, within a target frame rate and a CPU budget.
+    """
+
+    def __init__(self, gaze, motion_threshold=3.0, max_interval=0.5, active_duration=1.0, target_fps=None,
+                 cpu_budget=None, blink_ratio=3.0, thumbnail_width=64):
+        """
+        Arguments:
+            gaze (gaze_tracking.GazeTracking): Gaze tracking run on the analyzed frames
+            motion_threshold (float): Mean absolute difference of the thumbnails, in gray
+                levels, from which a frame is considered to have moved
+            max_interval (float): Maximum time between two analyses, in seconds
+            active_duration (float): Time during which every frame is analyzed after
+                motion or a possible blink, in seconds
+            target_fps (float): Maximum number of analyses per second
+            cpu_budget (float): Maximum fraction of the time spent analyzing frames
+            blink_ratio (float): Blinking ratio from which the eyes may be closing
+            thumbnail_width (int): Width of the frame thumbnail
+        """
+        self.gaze = gaze
+        self.motion_threshold = motion_threshold
+        self.max_interval = max_interval
+        self.active_duration = active_duration
+        self.target_fps = target_fps
+        self.cpu_budget = cpu_budget
+        self.blink_ratio = blink_ratio
+        self.thumbnail_width = thumbnail_width
+
+        self.frames = 0
+        self.analyzed = 0
+        self.motion = 0.0
+        self.analysis_time = 0.0  # Moving average of the duration of an analysis
+
+        self._thumbnail = None
+        self._eyes_thumbnail = None
+        self._last_analysis = None
+        self._active_until = None
+
+    @property
+    def skip_rate(self):
+        """Fraction of the frames whose analysis was skipped"""
+        return 1 - self.analyzed / self.frames if self.frames else 0.0
+
+    def _eyes_area(self, frame):
+        """Returns the area of the eyes in the face box of the last analysis, or None"""
+        face = self.gaze.face
+        if face is None:
+            return None
+        height, width = frame.shape[:2]
+        top = max(face.top() + face.height() // 5, 0)
+        bottom = min(face.top() + face.height() * 3 // 5, height)
+        left, right = max(face.left(), 0), min(face.right(), width)
+        if bottom <= top or right <= left:
+            return None
+        return frame[top:bottom, left:right]
+
+    def _thumbnail_of(self, frame):
+        """Returns a grayscale thumbnail of the frame"""
+        height, width = frame.shape[:2]
+        size = (self.thumbnail_width, max(int(height * self.thumbnail_width / width), 1))
+        # Averaging every pixel of a large frame costs more than a millisecond,
+        # a strided view keeps about 4x4 pixels per thumbnail pixel
+        step = max(width // (self.thumbnail_width * 4), 1)
+        return cv2.cvtColor(cv2.resize(frame[::step, ::step], size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+
+    def _eyes_thumbnail_of(self, frame):
+        """Returns a grayscale thumbnail of the eyes area, or None if there is no face"""
+        eyes = self._eyes_area(frame)
+        if eyes is None:
+            return None
+        return cv2.cvtColor(cv2.resize(eyes, (48, 16), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+
+    @staticmethod
+    def _difference(a, b):
+        """Returns the mean absolute difference of two thumbnails"""
+        return cv2.norm(a, b, cv2.NORM_L1) / a.size
+
+    def _min_interval(self):
+        """Returns the minimum time between two analyses allowed by the frame rate and CPU budget"""
+        interval = 0.0
+        if self.target_fps:
+            interval = 1 / self.target_fps
+        if self.cpu_budget:
+            interval = max(interval, self.analysis_time / self.cpu_budget)
+        return interval
+
+    def _is_due(self, now, motion):
+        """Returns true if the frame must be analyzed"""
+        if self._last_analysis is None:
+            return True
+        elapsed = now - self._last_analysis
+        if elapsed >= self.max_interval:
+            return True
+
+        result = self.gaze.result
+        possible_blink = result.blinking_ratio is not None and result.blinking_ratio >= self.blink_ratio
+        if motion >= self.motion_threshold or possible_blink or result.is_blinking:
+            self._active_until = now + self.active_duration
+
+        active = self._active_until is not None and now < self._active_until
+        return active and elapsed >= self._min_interval()
+
+    def refresh(self, frame, now=None):
+        """Analyzes the frame if it is due, otherwise reuses the previous
+        result. Like GazeTracking.refresh, returns the GazeResult of the frame.
+
+        Arguments:
+            frame (numpy.ndarray): The frame to analyze
+            now (float): Time of the frame, time.monotonic() by default
+        """
+        if now is None:
+            now = time.monotonic()
+        self.frames += 1
+
+        # Blinks barely change the frame thumbnail, the eyes area is compared too
+        thumbnail = self._thumbnail_of(frame)
+        if self._thumbnail is None or thumbnail.shape != self._thumbnail.shape:
+            self.motion = float("inf")
+        else:
+            self.motion = self._difference(thumbnail, self._thumbnail)
+            if self._eyes_thumbnail is not None:
+                self.motion = max(self.motion, self._difference(self._eyes_thumbnail_of(frame), self._eyes_thumbnail))
+
+        if not self._is_due(now, self.motion):
+            # Nothing moved, the pupils are drawn on the current frame
+            return self.gaze.reuse(frame)
+
+        start = time.perf_counter()
+        result = self.gaze.refresh(frame)
+        duration = time.perf_counter() - start
+        self.analysis_time = duration if self.analyzed == 0 else 0.9 * self.analysis_time + 0.1 * duration
+        self.analyzed += 1
+        self._last_analysis = now
+
+        # Thumbnails of the analyzed frame, with the eyes area of the new face box
+        self._thumbnail = thumbnail
+        self._eyes_thumbnail = self._eyes_thumbnail_of(frame)
+        return result
@@ -1,24 +1,49 @@
-import serial
+import argparse
 import time
+from focuson.serial_output import SerialOutput, score_to_color
 
-# Replace with the correct port (e.g., "COM5" or "/dev/ttyACM1")
-port = "/dev/cu.usbmodem1103"
-ser = serial.Serial(port, 9600)
-
-def score_to_color(score):
-    if score >= 70:
-        return "green"
-    elif score >= 30:
-        return "yellow"
-    else:
-        return "red"
-
-def send_color(score):
-    color = score_to_color(score)
-    ser.write((color + "\n").encode())
-
-# Example test
-scores = [95, 50, 20, 75, 65, 10]
-for s in scores:
-    send_color(s)
-    time.sleep(1)
\ No newline at end of file
+
+def main():
+    parser = argparse.ArgumentParser(description="Sends a sequence of focus colors to the LED device")
+    # Replace with the correct port (e.g., "COM5" or "/dev/ttyACM1")
+    parser.add_argument("--port", default="/dev/cu.usbmodem1103")
+    parser.add_argument("--fake", action="store_true", help="Use a pseudo-terminal instead of the device")
+    args = parser.parse_args()
+
+    device = None
+    if args.fake:
+        from focuson.fake_serial import FakeSerialDevice
+        device = FakeSerialDevice().plug()
+        args.port = device.port
+
+    ser = SerialOutput(args.port, 9600, heartbeat=2, reconnect_delay=0.5).start()
+
+    # Example test
+    scores = [95, 50, 20, 75, 65, 10]
+    for s in scores:
+        ser.send_score(s)
+        time.sleep(1)
+
+    if device is not None:
+        # Unplug the device: the output must reconnect and send the current color again
+        device.unplug()
+        time.sleep(1)
+        device.plug()
+        time.sleep(1.5)
+
+    ser.close()
+
+    if device is not None:
+        received = device.received()
+        device.close()
+
+        # Consecutive duplicates are heartbeats or resends after the reconnection
+        expected = [score_to_color(s) for s in scores]
+        changes = [color for i, color in enumerate(received) if i == 0 or color != received[i - 1]]
+        assert changes == expected, f"Expected {expected}, received {received}"
+        assert received[-1] == expected[-1], f"Current color not resent after reconnection: {received}"
+        print(f"Fake device received: {received}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import threading
+import time
+
+import pytest
+
+from focuson import api_client
+from focuson.api_client import ApiClient, TokenBucket
+from focuson.fake_api import FakeOpenAIServer
+from focuson.metrics import Metrics
+from focuson.productivity import BatchingClassifier, analyze_productivity_with_chatgpt, analyze_screenshots
+
+pytest.importorskip("openai")
+
+IMAGE = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+
+
+@pytest.fixture
+def server():
+    server = FakeOpenAIServer(verdict="NON-PRODUCTIVE").start()
+    yield server
+    server.stop()
+
+
+def client_of(server, **options):
+    options.setdefault("rate", None)
+    options.setdefault("backoff_base", 0.01)
+    return ApiClient(api_key="fake", base_url=server.base_url, **options)
+
+
+def test_connection_is_reused(server):
+    client = client_of(server)
+    results = [analyze_productivity_with_chatgpt(IMAGE, 5, client) for _ in range(5)]
+
+    assert results == ["NON-PRODUCTIVE"] * 5
+    assert server.connections == 1
+    assert client.requests == 5
+
+
+def test_rate_limits_and_server_errors_are_retried(server):
+    server.failures = [429, 503, 500]
+    client = client_of(server)
+
+    assert analyze_productivity_with_chatgpt(IMAGE, 5, client) == "NON-PRODUCTIVE"
+    assert client.retries == 3
+    assert server.rejected == 3
+
+
+def test_retry_after_is_respected(server):
+    server.failures = [429]
+    server.retry_after = 0.3
+    client = client_of(server)
+
+    start = time.monotonic()
+    assert analyze_productivity_with_chatgpt(IMAGE, 5, client) == "NON-PRODUCTIVE"
+    assert time.monotonic() - start >= 0.3
+
+
+def test_client_errors_are_not_retried(server):
+    server.failures = [400]
+    client = client_of(server)
+
+    assert analyze_productivity_with_chatgpt(IMAGE, 5, client).startswith("Error: Error code: 400")
+    assert client.retries == 0
+
+
+def test_retries_stop_at_the_timeout(server):
+    server.failures = [503] * 100
+    client = client_of(server, backoff_base=0.2, max_retries=100)
+
+    start = time.monotonic()
+    assert analyze_productivity_with_chatgpt(IMAGE, 0.5, client).startswith("Error")
+    assert time.monotonic() - start < 1.0
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # Two tokens at once, then one every 50 ms
+    assert time.monotonic() - start >= 0.19
+    assert not bucket.acquire(timeout=0.01)
+
+
+def test_token_bucket_keeps_stations_under_the_rate_limit(server):
+    server.rate_limit = 5
+    client = client_of(server, rate=4, burst=1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(analyze_productivity_with_chatgpt(IMAGE, 10, client)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["NON-PRODUCTIVE"] * 8
+    assert server.rejected == 0
+
+
+def test_batch_verdicts_are_split(server):
+    client = client_of(server)
+
+    assert analyze_screenshots([IMAGE] * 3, 5, client) == ["NON-PRODUCTIVE"] * 3
+    assert len(server.requests) == 1
+    assert server.images(server.requests[0]) == 3
+
+
+def test_batch_with_a_wrong_number_of_verdicts_fails(server):
+    server.verdict = "PRODUCTIVE\nUNKNOWN"  # Two lines per image
+    client = client_of(server)
+
+    results = analyze_screenshots([IMAGE] * 3, 5, client)
+    assert results == ["Error: 6 verdicts for 3 screenshots"] * 3
+
+
+def run_concurrently(classifier, count):
+    results = [None] * count
+
+    def classify(i):
+        results[i] = classifier(f"image-{i}", timeout=5)
+
+    threads = [threading.Thread(target=classify, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+    return results
+
+
+def test_batching_classifier_caps_the_batches():
+    sizes = []
+
+    def analyze(images, timeout=None):
+        sizes.append(len(images))
+        time.sleep(0.05)
+        return [f"PRODUCTIVE {image}" for image in images]
+
+    results = run_concurrently(BatchingClassifier(analyze, batch_size=4, max_wait=0.2), 10)
+
+    assert results == [f"PRODUCTIVE image-{i}" for i in range(10)]
+    assert max(sizes) <= 4
+    assert sum(sizes) == 10
+
+
+def test_batching_classifier_fails_every_screenshot_on_missing_results():
+    results = run_concurrently(BatchingClassifier(lambda images, timeout=None: ["PRODUCTIVE"], batch_size=2), 2)
+
+    assert results == ["Error: 1 results for 2 screenshots"] * 2
+
+
+def test_shared_client_exports_to_the_app_metrics(server, monkeypatch):
+    monkeypatch.setattr(api_client, "_shared", None)
+    monkeypatch.setenv("OPENAI_API_KEY", "fake")
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    metrics = Metrics()
+    client = api_client.shared_client(metrics=metrics)
+    try:
+        assert api_client.shared_client() is client
+        assert client.metrics is metrics
+        analyze_productivity_with_chatgpt(IMAGE, 5, client)
+        assert metrics.snapshot()['stages']['api_request']['count'] == 1
+    finally:
+        client.close()
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from focuson.classifier import (
+    NON_PRODUCTIVE, PRODUCTIVE, ClassifierChain, FakeWindowProvider, ScreenFeaturesTier, WindowInfo, WindowProvider,
+    WindowRules, WindowTier,
+)
+
+RULES = WindowRules(
+    productive=["Visual Studio Code", "GitHub"],
+    non_productive=["YouTube", "Disney+"],
+    productive_processes=["OUTLOOK", "Terminal"],
+    non_productive_processes=["steam"],
+)
+
+
+class StubScreenshot(object):
+    """Returns the same screenshot, and counts the calls"""
+
+    def __init__(self, image):
+        self.image = image
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.image
+
+
+def chain(windows):
+    return ClassifierChain([WindowTier(FakeWindowProvider(windows), RULES), ScreenFeaturesTier()])
+
+
+def media_screen():
+    # Vivid colors, without any dominant gray level
+    pixels = np.random.default_rng(0).integers(0, 256, (180, 320, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+def test_title_rules_match_whole_words():
+    assert RULES.match(WindowInfo("main.py - Visual Studio Code", "Code")) == PRODUCTIVE
+    assert RULES.match(WindowInfo("Cats - YouTube - Chrome", "chrome")) == NON_PRODUCTIVE
+    assert RULES.match(WindowInfo("Disney+ | Home", "chrome")) == NON_PRODUCTIVE
+    assert RULES.match(WindowInfo("GitHubber stories", "chrome")) is None
+
+
+def test_process_rules_match_the_whole_process_name():
+    assert RULES.match(WindowInfo("Inbox", "OUTLOOK.EXE")) == PRODUCTIVE
+    assert RULES.match(WindowInfo("Library", "steam")) == NON_PRODUCTIVE
+    # Process names do not match the title
+    assert RULES.match(WindowInfo("Economic outlook", "chrome")) is None
+    assert RULES.match(WindowInfo("Steam sale news", "firefox")) is None
+
+
+def test_providers_must_read_the_active_window():
+    class NoWindow(WindowProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        NoWindow()
+
+
+def test_window_tier_decides_without_screenshot():
+    screenshot = StubScreenshot(media_screen())
+    classifier = chain([("main.py - Visual Studio Code", "Code"), ("Cats - YouTube", "chrome")])
+
+    assert classifier.classify(screenshot) == PRODUCTIVE
+    assert classifier.classify(screenshot) == NON_PRODUCTIVE
+    assert screenshot.calls == 0
+
+
+def test_conflicting_rules_fall_through():
+    screenshot = StubScreenshot(media_screen())
+    classifier = chain([("GitHub talk - YouTube", "chrome")])
+
+    # Both lists match, the screen features decide
+    assert classifier.classify(screenshot) == NON_PRODUCTIVE
+    assert screenshot.calls == 1
+
+
+def test_undecided_screens_are_left_to_the_cloud_model():
+    document = StubScreenshot(Image.new("RGB", (320, 180), "white"))
+    classifier = chain([("Untitled", "editor")])
+
+    # Flat screens are only productive when the text thresholds are set
+    assert classifier.classify(document) is None
+    assert ScreenFeaturesTier(text_background=0.6).classify(document) == PRODUCTIVE
+
+
+def test_stats():
+    classifier = chain([
+        ("main.py - Visual Studio Code", "Code"),
+        ("Untitled", "editor"),
+        ("GitHub talk - YouTube", "chrome"),
+    ])
+    classifier.classify(StubScreenshot(media_screen()))
+    classifier.classify(StubScreenshot(Image.new("RGB", (320, 180), "white")))
+    classifier.classify(StubScreenshot(media_screen()))
+
+    stats = classifier.stats()
+    assert stats['fallbacks'] == 1
+    assert {name: (tier['calls'], tier['hits']) for name, tier in stats['tiers'].items()} == {
+        'window': (3, 1),
+        'screen': (2, 1),
+    }
+    assert stats['tiers']['window']['hit_rate'] == 1 / 3
+    assert stats['tiers']['screen']['hit_rate'] == 0.5
+    assert stats['tiers']['window']['mean_us'] > 0
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from focuson.focus_score import PARAMETERS, FocusScore, series_from_recording, simulate
+from focuson.recorder import NON_PRODUCTIVE, PRODUCTIVE, SessionRecorder, load_recording
+
+COMBINATIONS = [
+    {},
+    {'blink_threshold': 20, 'blink_penalty': 10, 'recovery_rate': 0.5},
+    {'eye_contact_threshold': 2, 'eye_contact_penalty': 7, 'productivity_penalty': 15},
+]
+
+
+def random_series(n=600, seed=0):
+    """Returns irregular frames with unknown blink changes, runs looking away and
+    non-productive messages, inputs of simulate()"""
+    rng = np.random.default_rng(seed)
+    times = np.cumsum(rng.uniform(0.02, 0.5, n))
+    changes = np.where(rng.random(n) < 0.2, np.nan, rng.uniform(0, 80, n))
+    away = np.repeat(rng.random(n // 20) < 0.4, 20)
+    run_start = away & ~np.concatenate(([False], away[:-1]))
+    start_times = np.maximum.accumulate(np.where(run_start, times, -np.inf))
+    time_looking_away = np.where(away, times - start_times, np.nan)
+    non_productive = np.repeat(rng.random(n // 10) < 0.3, 10)
+    return times, changes, time_looking_away, non_productive
+
+
+def replay(series, **parameters):
+    """Returns the scores of FocusScore.update, frame by frame"""
+    times, changes, time_looking_away, non_productive = series
+    score = FocusScore(times[0], **parameters)
+    return np.array([
+        score.update(t, None if np.isnan(change) else change, None if np.isnan(away) else away, bool(flag))
+        for t, change, away, flag in zip(times, changes, time_looking_away, non_productive)
+    ])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_simulate_matches_focus_score_frame_by_frame(seed):
+    series = random_series(seed=seed)
+    for parameters in COMBINATIONS:
+        np.testing.assert_allclose(simulate(*series, **parameters)[:, 0], replay(series, **parameters), atol=1e-9)
+
+
+def test_simulate_combinations_at_once():
+    series = random_series()
+    grid = {name: np.array([combination.get(name, default) for combination in COMBINATIONS])
+            for name, default in PARAMETERS.items()}
+    scores = simulate(*series, **grid)
+    for i, parameters in enumerate(COMBINATIONS):
+        np.testing.assert_allclose(scores[:, i], replay(series, **parameters), atol=1e-9)
+
+
+def test_series_from_recording_uses_the_reported_message(tmp_path):
+    recorder = SessionRecorder(str(tmp_path), sample_interval=1.0)
+    # The verdict stays NON_PRODUCTIVE, but the message is only shown for the first 5 seconds
+    for t in range(20):
+        productivity = PRODUCTIVE if t < 5 else NON_PRODUCTIVE
+        recorder.append(float(t), 15.0, 0.55, 0.5, 100.0, productivity, 5 <= t < 10)
+    recorder.close()
+
+    times, _, _, non_productive = series_from_recording(load_recording(str(tmp_path)))
+    np.testing.assert_array_equal(times, np.arange(20.0))
+    np.testing.assert_array_equal(non_productive, (times >= 5) & (times < 10))
+
@@ -0,0 +1,24 @@
+import json
+
+from focuson.metrics import Metrics
+
+
+def test_jsonl_latencies_cover_the_last_interval(tmp_path):
+    jsonl = tmp_path / "metrics.jsonl"
+    prom = tmp_path / "metrics.prom"
+    metrics = Metrics(str(jsonl), str(prom))
+    for _ in range(100):
+        metrics.observe("detection", 0.2)
+    metrics.export()
+    for _ in range(10):
+        metrics.observe("detection", 0.004)
+    metrics.export()
+    metrics.export()
+
+    first, second, third = [json.loads(line)['stages']['detection'] for line in jsonl.read_text().splitlines()]
+    assert (first['count'], first['p95_ms']) == (100, 250)
+    assert (second['count'], second['p95_ms']) == (10, 5)
+    assert (third['count'], third['p95_ms']) == (0, None)
+
+    # Prometheus histograms stay cumulative
+    assert 'focuson_stage_latency_seconds_count{stage="detection"} 110' in prom.read_text()
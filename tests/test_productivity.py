@@ -0,0 +1,139 @@
+import base64
+import threading
+import time
+from functools import partial
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from focuson.api_client import ApiClient
+from focuson.fake_api import FakeOpenAIServer
+from focuson.productivity import (
+    BatchingClassifier, ProductivityWorker, analyze_productivity_with_chatgpt, analyze_screenshots, encode_screenshot,
+)
+
+
+def test_byte_budget_applies_to_the_base64_payload():
+    noise = np.random.default_rng(0).integers(0, 256, (360, 640, 3), dtype=np.uint8)
+    image = Image.fromarray(noise)
+    unbounded = encode_screenshot(image, "JPEG", 85)
+    max_bytes = len(unbounded) * 3 // 4  # Between the raw and base64 sizes of the unbounded JPEG
+    assert len(base64.b64decode(unbounded)) <= max_bytes < len(unbounded)
+
+    encoded = encode_screenshot(image, "JPEG", 85, max_bytes=max_bytes)
+    assert len(encoded) <= max_bytes
+
+
+IMAGE = Image.new("RGB", (64, 36), (240, 240, 240))
+
+
+@pytest.fixture
+def slow_server():
+    server = FakeOpenAIServer(verdict="NON-PRODUCTIVE", delay=2.0).start()
+    yield server
+    server.stop()
+
+
+def worker_of(server, **options):
+    client = ApiClient(api_key="fake", base_url=server.base_url, rate=None, max_retries=0)
+    classifier = partial(analyze_productivity_with_chatgpt, client=client)
+    return ProductivityWorker(screenshot=lambda: IMAGE, classifier=classifier, **options)
+
+
+def poll_until(worker, timeout, durations):
+    """Polls like the frame loop until a result arrives, recording the time of every call"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        result = worker.poll()
+        durations.append(time.perf_counter() - start)
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    return None
+
+
+def test_worker_posts_the_verdict():
+    pytest.importorskip("openai")
+    server = FakeOpenAIServer(verdict="NON-PRODUCTIVE").start()
+    worker = worker_of(server)
+    try:
+        assert worker.submit()
+        assert poll_until(worker, 5, []) == "NON-PRODUCTIVE"
+    finally:
+        worker.shutdown()
+        server.stop()
+
+
+def test_slow_requests_time_out_without_blocking_the_loop(slow_server):
+    pytest.importorskip("openai")
+    worker = worker_of(slow_server, timeout=0.3)
+    durations = []
+    try:
+        start = time.perf_counter()
+        assert worker.submit()
+        durations.append(time.perf_counter() - start)
+
+        result = poll_until(worker, 1.0, durations)
+        assert result == "Error: Productivity analysis timed out"
+        # Nothing is posted once the request is abandoned
+        assert poll_until(worker, 0.5, durations) is None
+        assert max(durations) < 0.05
+    finally:
+        worker.shutdown()
+
+
+def test_submit_is_refused_at_the_cap(slow_server):
+    pytest.importorskip("openai")
+    worker = worker_of(slow_server, max_in_flight=1, timeout=5)
+    try:
+        assert worker.submit()
+        assert not worker.submit()
+        assert worker.in_flight == 1
+    finally:
+        start = time.perf_counter()
+        worker.shutdown()
+        assert time.perf_counter() - start < 0.1  # Running requests are not waited for
+
+
+def test_stale_requests_are_abandoned():
+    first_started = threading.Event()
+    release_first = threading.Event()
+
+    def classifier(image_base64, timeout=None):
+        if not first_started.is_set():
+            first_started.set()
+            release_first.wait(5)  # The first request hangs until released
+            return "NON-PRODUCTIVE"
+        return "PRODUCTIVE"
+
+    worker = ProductivityWorker(screenshot=lambda: IMAGE, classifier=classifier, max_in_flight=2, timeout=5)
+    try:
+        assert worker.submit()
+        assert first_started.wait(1)
+        assert worker.submit()
+        # The newer verdict is posted, the older request is abandoned
+        assert poll_until(worker, 2, []) == "PRODUCTIVE"
+        release_first.set()
+        assert poll_until(worker, 0.3, []) is None
+        assert worker.in_flight == 0
+    finally:
+        release_first.set()
+        worker.shutdown()
+
+
+def test_worker_batches_screenshots_in_one_request():
+    pytest.importorskip("openai")
+    server = FakeOpenAIServer(verdict="NON-PRODUCTIVE").start()
+    client = ApiClient(api_key="fake", base_url=server.base_url, rate=None, max_retries=0)
+    batching = BatchingClassifier(partial(analyze_screenshots, client=client), batch_size=2, max_wait=2)
+    worker = ProductivityWorker(screenshot=lambda: IMAGE, classifier=batching, max_in_flight=2, timeout=5)
+    try:
+        assert worker.submit()
+        assert worker.submit()
+        assert poll_until(worker, 3, []) == "NON-PRODUCTIVE"
+        assert [FakeOpenAIServer.images(request) for request in server.requests] == [2]
+    finally:
+        worker.shutdown()
+        server.stop()
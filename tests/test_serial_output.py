@@ -0,0 +1,54 @@
+import sys
+import time
+
+import pytest
+
+from focuson.serial_output import SerialOutput
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_missing_pyserial_is_reported_once(monkeypatch, capsys):
+    monkeypatch.setitem(sys.modules, "serial", None)  # Importing it raises ImportError
+    output = SerialOutput("/dev/null", heartbeat=0.01).start()
+    assert wait_for(lambda: not output._thread.is_alive())
+    output.send_color("green")
+    output.close()
+
+    assert capsys.readouterr().out.count("pyserial is not installed") == 1
+    assert output.writes == 0
+
+
+
+def test_writer_is_idle_until_a_color_is_set():
+    output = SerialOutput("/dev/null", heartbeat=0.01).start()
+    try:
+        time.sleep(0.05)  # Past the heartbeat
+        cpu = time.process_time()
+        time.sleep(0.5)
+        assert time.process_time() - cpu < 0.1
+    finally:
+        output.close()
+    assert output.writes == 0
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="The fake device is a pseudo-terminal")
+def test_colors_reach_the_device():
+    pytest.importorskip("serial")
+    from focuson.fake_serial import FakeSerialDevice
+
+    device = FakeSerialDevice().plug()
+    output = SerialOutput(device.port, heartbeat=10).start()
+    try:
+        output.send_score(95)
+        assert wait_for(lambda: "green" in device.received())
+        output.send_score(10)
+        assert wait_for(lambda: "red" in device.received())
+    finally:
+        output.close()
+        device.close()
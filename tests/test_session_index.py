@@ -0,0 +1,37 @@
+import json
+import os
+
+from focuson.session_index import SessionIndex
+
+
+def write_report(reports_dir, folder, mtime, **data):
+    os.makedirs(reports_dir / folder, exist_ok=True)
+    path = reports_dir / folder / "session_data.json"
+    path.write_text(json.dumps(data))
+    os.utime(path, (mtime, mtime))
+
+
+def test_refresh_picks_up_rewritten_reports(tmp_path):
+    write_report(tmp_path, "session_1", 1000, start_time=1000, avg_focus_score=50)
+    index = SessionIndex(str(tmp_path))
+    assert index.refresh() == 1
+    assert index.refresh() == 0
+
+    # Rewriting a report leaves the modification time of the reports folder unchanged
+    reports_mtime = os.stat(tmp_path).st_mtime
+    write_report(tmp_path, "session_1", 2000, start_time=1000, avg_focus_score=80)
+    os.utime(tmp_path, (reports_mtime, reports_mtime))
+    assert index.refresh() == 1
+    assert [row['avg_focus_score'] for row in index.sessions()] == [80]
+
+
+def test_refresh_drops_removed_folders_and_full_reparses(tmp_path):
+    write_report(tmp_path, "session_1", 1000, start_time=1000)
+    write_report(tmp_path, "session_2", 1000, start_time=2000)
+    index = SessionIndex(str(tmp_path))
+    assert index.refresh() == 2
+
+    os.remove(tmp_path / "session_2" / "session_data.json")
+    assert index.refresh() == 0
+    assert index.refresh(full=True) == 1
+    assert [row['folder'] for row in index.sessions()] == ["session_1"]
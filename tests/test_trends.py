@@ -0,0 +1,44 @@
+import time
+
+import numpy as np
+import pytest
+
+from focuson.trends import _dates, compute_trends, week_starts
+
+
+@pytest.fixture
+def paris(monkeypatch):
+    """Local time with DST changes: UTC+2 in summer, UTC+1 in winter"""
+    monkeypatch.setenv("TZ", "Europe/Paris")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def local(*date):
+    return time.mktime(date + (0, 0, -1))
+
+
+def test_week_starts_across_dst_changes(paris):
+    # DST ended on Sunday 2024-10-27
+    timestamps = np.array([
+        local(2024, 10, 21, 0, 30, 0),  # Summer time
+        local(2024, 10, 27, 23, 30, 0),  # Winter time, same week
+        local(2024, 10, 28, 0, 30, 0),
+        local(2024, 7, 1, 0, 10, 0),
+    ])
+    expected = [local(2024, 10, 21, 0, 0, 0)] * 2 + [local(2024, 10, 28, 0, 0, 0), local(2024, 7, 1, 0, 0, 0)]
+    np.testing.assert_array_equal(week_starts(timestamps), expected)
+    assert _dates(timestamps, 'm').tolist() == [
+        "2024-10-21T00:30", "2024-10-27T23:30", "2024-10-28T00:30", "2024-07-01T00:10",
+    ]
+
+
+def test_weekly_delta_is_nan_after_a_week_without_sessions(paris):
+    start_times = np.array([local(2024, 3, 4, 10, 0, 0), local(2024, 3, 11, 10, 0, 0), local(2024, 3, 25, 10, 0, 0),
+                            local(2024, 4, 1, 10, 0, 0)])
+    trends = compute_trends(start_times, {'avg_focus_score': [50, 60, 90, 80]}, window=2)
+
+    assert _dates(trends['weeks'], 'D').tolist() == ["2024-03-04", "2024-03-11", "2024-03-25", "2024-04-01"]
+    np.testing.assert_array_equal(trends['weekly_delta']['avg_focus_score'], [np.nan, 10, np.nan, -10])
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+FocusON Focus Score Tuning Tool
+Replays the focus score rules on recorded sessions for every combination
+of the given parameters, and ranks the combinations by how close the mean
+score of each session is to its label.
+
+Usage:
+    python tune_focus_score.py labels.json [--blink-threshold 30 40 50] [--recovery-rate 0.05 0.1 0.2]
+
+labels.json maps recording folders to the focus score expected for them,
+for instance {"reports/recordings/20250101_090000": 80}.
+"""
+
+import argparse
+import json
+import numpy as np
+from focuson.focus_score import PARAMETERS, mean_scores, parameter_grid, series_from_recording
+from focuson.recorder import load_recording
+
+
+def tune(labels, grid):
+    """Returns the root mean square error between the mean score of the
+    labeled sessions and their label, for every combination of parameters
+
+    Arguments:
+        labels (dict): Expected focus score per recording folder
+        grid (dict): Arrays of the values of each parameter, see focus_score.parameter_grid
+    """
+    means = np.array([mean_scores(series_from_recording(load_recording(directory)), grid) for directory in labels])
+    expected = np.array(list(labels.values()), float)[:, None]
+    return np.sqrt(np.mean((means - expected) ** 2, axis=0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("labels", help="JSON file mapping recording folders to their expected focus score")
+    for name, default in PARAMETERS.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=float, nargs="+", default=[default],
+                            help=f"Values tried, {default} by default")
+    parser.add_argument("--top", type=int, default=10, help="Number of combinations printed")
+    args = parser.parse_args()
+
+    with open(args.labels) as f:
+        labels = json.load(f)
+    if not labels:
+        raise SystemExit(f"No labeled sessions in {args.labels}")
+    grid = parameter_grid(**{name: getattr(args, name) for name in PARAMETERS})
+    errors = tune(labels, grid)
+
+    print(f"{len(errors)} combinations on {len(labels)} sessions, root mean square error of the mean score:")
+    for i in np.argsort(errors)[:args.top]:
+        settings = ", ".join(f"{name}={grid[name][i]:g}" for name in PARAMETERS)
+        print(f"   {errors[i]:6.2f}  {settings}")
+
+
+if __name__ == "__main__":
+    main()